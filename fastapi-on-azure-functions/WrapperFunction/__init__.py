@@ -1,12 +1,13 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse, ORJSONResponse
 import uuid
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 from fastapi.encoders import jsonable_encoder
 from models import (
     LostItem,
+    LostItemPage,
     LostItemBySubcategory,
     KeywordRequest,
     LostItemRequest,
@@ -18,20 +19,32 @@ from models import (
     KeywordUpdateRequest,
     isCheckedUpdateRequest
 )
-from database import get_lost_item_container, get_lost_item_by_subcategory_container
-from chat_service import ChatService
+from database import LOST_ITEM_BY_SUBCATEGORY_CONTAINER_NAME, NOT_DELETED_FILTER, get_lost_item_container, get_lost_item_by_subcategory_container, tombstone_operations, tombstone_items_by_partition
+from chat_service import ChatService, NoKeywordsError
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidContinuationToken, encode_continuation, continuation_filter, order_by_clause
+from lost_item_query import query_lost_items, iter_lost_item_pages
+from partition_index import partition_key_index
+from search_cache import search_result_cache
+from llm_cache import resolution_cache, KEYWORD as KEYWORD_RESOLUTION
+from keyword_snapshot import keyword_snapshot
+from image_cache import image_analysis_cache
+from projection import resolve_fields, select_clause
+from serialization import trusted_lost_items_response, dumps_line
 import logging
+from azure.cosmos.exceptions import CosmosAccessConditionFailedError
 from azure.storage.blob import BlobServiceClient
 from azure.identity import DefaultAzureCredential
 import os
-from table_storage import add_lost_item as add_lost_item_to_table_storage, list_lost_items, delete_lost_items_by_keyword, delete_all_labels
+from table_storage import add_lost_item as add_lost_item_to_table_storage, add_lost_items_bulk, list_lost_items, list_keywords, delete_lost_items_by_keyword, delete_all_labels, migrate_row_keys
 import asyncio
+import time
 import concurrent.futures
 from azure.cognitiveservices.vision.customvision.training import CustomVisionTrainingClient
 from azure.cognitiveservices.vision.customvision.training.models import ImageFileCreateEntry, ImageFileCreateBatch
 from msrest.authentication import CognitiveServicesCredentials
 from msrest.authentication import ApiKeyCredentials
 import httpx
+from label_import import LABELS_BULK_MAX_ROWS, iter_label_rows, validate_label_row
 
 # ロギングの設定
 logging.basicConfig(level=logging.INFO)
@@ -41,10 +54,6 @@ app = FastAPI()
 
 chat_service = ChatService()
 
-# Cosmos DB のコンテナ取得
-lost_items_container = get_lost_item_container()  # LostItems コンテナ
-lost_items_by_subcategory_container = get_lost_item_by_subcategory_container()  # LostItemBySubcategory コンテナ
-
 # 環境変数から設定を取得
 BLOB_CONTAINER_NAME = "images"  # コンテナ名
 BLOB_ACCOUNT_URL = os.getenv("AZURE_BLOB_ACCOUNT_URL")  # ストレージアカウントのURL
@@ -64,47 +73,106 @@ trainer = CustomVisionTrainingClient(
 
 executor = concurrent.futures.ThreadPoolExecutor()
 
-@app.get("/lostitems", response_model=List[LostItem])
-async def get_lost_items(
+# NDJSON ストリーミング時に Cosmos DB から1回で読み込む件数
+STREAM_PAGE_SIZE = 100
+
+# 検索条件の解決（GPT 呼び出し）1回あたりのタイムアウト（秒）
+RESOLVER_TIMEOUT_SECONDS = float(os.getenv("RESOLVER_TIMEOUT_SECONDS", "10"))
+
+# /imagescan/batch で一度に受け付ける画像の最大数
+IMAGE_BATCH_MAX_FILES = int(os.getenv("IMAGE_BATCH_MAX_FILES", "50"))
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    キャッシュのヒット率などの統計情報を返すエンドポイント
+    """
+    return {
+        "searchCache": search_result_cache.stats(),
+        "llmCache": resolution_cache.stats(),
+        "keywordSnapshot": keyword_snapshot.stats(),
+        "openai": chat_service.limiter.stats(),
+        "singleflight": chat_service.singleflight.stats(),
+        "imageCache": image_analysis_cache.stats()
+    }
+
+async def resolve_with_timeout(resolver, value: str) -> str:
+    """
+    検索条件を GPT で解決する。タイムアウトまたは失敗した場合は入力値をそのまま使用する
+    :param resolver: ChatService の非同期リゾルバ
+    :param value: ユーザーの入力値
+    """
+    try:
+        return await asyncio.wait_for(resolver(value), timeout=RESOLVER_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning(f"Resolving '{value}' timed out after {RESOLVER_TIMEOUT_SECONDS}s, using input as is")
+    except Exception as e:
+        logger.warning(f"Failed to resolve '{value}': {e}, using input as is")
+    return value
+
+async def resolve_nothing():
+    """
+    条件が指定されていない場合に asyncio.gather へ渡すプレースホルダ
+    """
+    return None
+
+async def build_lost_item_filters(
     free_text: Optional[str] = None,
-    municipality: Optional[str] = None,
+    municipality: Optional[List[str]] = None,
     itemName: Optional[str] = None,
     color: Optional[str] = None,
     findDate: Optional[str] = None,
-    isChecked: Optional[bool] = None  # 新しい引数を追加
+    isChecked: Optional[bool] = None
 ):
     """
-    Cosmos DB から忘れ物データをクエリし、結果を返す
-    - `free_text`: フリーワードで検索
-    - `municipality`: 市区町村でフィルタリング
-    - `itemName`: 中分類でフィルタリング
-    - `color`: 色でフィルタリング
-    - `findDate`: 指定日数以内でフィルタリング
-    - `isChecked`: チェック済みかどうかでフィルタリング
+    検索条件から Cosmos DB クエリの対象コンテナ、WHERE 句とパラメータを作成する
+    - 市区町村が指定された場合は LostItems（/createUserPlace）の該当パーティションのみをクエリする
+    - 中分類のみが指定された場合は LostItemsBySubcategory（/Subcategory）の該当パーティションをクエリする
+    パーティションキーとなる条件は WHERE 句には含めず、対象パーティションとして返す
+    :return: (コンテナ, フィルタ式のリスト, クエリパラメータのリスト, 対象パーティションのリスト（指定なしの場合は None）,
+              解決済みの検索条件（検索結果キャッシュのキーと無効化に使用）)
     """
-    query = "SELECT * FROM c"
-    filters = []
+    container = await get_lost_item_container()
+    # 論理削除され、ttl による削除を待っているドキュメントは除外する
+    filters = [NOT_DELETED_FILTER]
     parameters = []
+    criteria = {}
+
+    # フリーワード・市区町村・中分類の解決（GPT 呼び出し）は並行して実行する
+    keyword, municipalities_selected, itemName_selected = await asyncio.gather(
+        resolve_with_timeout(chat_service.select_closest_keyword, free_text) if free_text else resolve_nothing(),
+        asyncio.gather(*[resolve_with_timeout(chat_service.select_location_async, name) for name in municipality or []]),
+        resolve_with_timeout(chat_service.select_category_async, itemName) if itemName else resolve_nothing(),
+    )
 
     # フリーワードから最も近いキーワードを取得
     if free_text:
-        keyword = await chat_service.select_closest_keyword(free_text)
         filters.append("ARRAY_CONTAINS(c.keyword, @keyword)")
         parameters.append({"name": "@keyword", "value": keyword})
+        criteria["keyword"] = keyword
 
+    partition_keys = None
     if municipality:
-        municipality_selected = chat_service.select_location(municipality)
-        filters.append("c.createUserPlace = @municipality")
-        parameters.append({"name": "@municipality", "value": municipality_selected})
+        partition_keys = []
+        for municipality_selected in municipalities_selected:
+            if municipality_selected not in partition_keys:
+                partition_keys.append(municipality_selected)
+        criteria["createUserPlace"] = sorted(partition_keys)
 
     if itemName:
-        itemName_selected = chat_service.select_category(itemName)
-        filters.append("c.item.itemName = @itemName")
-        parameters.append({"name": "@itemName", "value": itemName_selected})
+        criteria["itemName"] = itemName_selected
+        if partition_keys is None:
+            # 中分類ごとのビューから1パーティションで取得する
+            container = await get_lost_item_by_subcategory_container()
+            partition_keys = [itemName_selected]
+        else:
+            filters.append("c.item.itemName = @itemName")
+            parameters.append({"name": "@itemName", "value": itemName_selected})
 
     if color:
         filters.append("c.color.id = @color")
         parameters.append({"name": "@color", "value": color})
+        criteria["color"] = color
 
     # 日付フィルタ
     if findDate:
@@ -123,39 +191,172 @@ async def get_lost_items(
         if date_value:
             filters.append("c.findDateTime >= @findDate")
             parameters.append({"name": "@findDate", "value": date_value})
+            criteria["findDateTime"] = date_value
 
     # isChecked フィルタ
     if isChecked is not None:
         filters.append("c.isChecked = @isChecked")
         parameters.append({"name": "@isChecked", "value": isChecked})
+        criteria["isChecked"] = isChecked
+
+    return container, filters, parameters, partition_keys, criteria
 
+@app.get("/lostitems", response_model=Union[List[LostItem], LostItemPage])
+async def get_lost_items(
+    free_text: Optional[str] = None,
+    municipality: Optional[List[str]] = Query(None),
+    itemName: Optional[str] = None,
+    color: Optional[str] = None,
+    findDate: Optional[str] = None,
+    isChecked: Optional[bool] = None,  # 新しい引数を追加
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    continuation: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """
+    Cosmos DB から忘れ物データをクエリし、結果を返す（findDateTime の降順）
+    - `free_text`: フリーワードで検索
+    - `municipality`: 市区町村でフィルタリング（複数指定可。パーティション単位で並列にクエリする）
+    - `itemName`: 中分類でフィルタリング（市区町村の指定がない場合は中分類ごとのビューから取得する）
+    - `color`: 色でフィルタリング
+    - `findDate`: 指定日数以内でフィルタリング
+    - `isChecked`: チェック済みかどうかでフィルタリング
+    - `limit`: 1ページあたりの件数（指定した場合はページ単位で返す）
+    - `continuation`: 前のページのレスポンスに含まれる継続トークン
+    - `fields`: 返すフィールド（`summary`, `detail` またはカンマ区切りのフィールド名。指定なしの場合は全フィールド）
+
+    `limit` または `continuation` を指定した場合は `{"items": [...], "continuation": "..."}` 形式で返す。
+    """
+    try:
+        selected_fields = resolve_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"fields の指定が不正です: {str(e)}")
+
+    query = select_clause(selected_fields)
+    container, filters, parameters, partition_keys, criteria = await build_lost_item_filters(
+        free_text, municipality, itemName, color, findDate, isChecked
+    )
+
+    # ページング
+    paginate = limit is not None or continuation is not None
+    if continuation:
+        try:
+            continuation_clause, continuation_parameters = continuation_filter(continuation)
+        except InvalidContinuationToken as e:
+            raise HTTPException(status_code=400, detail=f"継続トークンが不正です: {str(e)}")
+        filters.append(continuation_clause)
+        parameters.extend(continuation_parameters)
+
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+
+    # 継続トークンで同じ位置から再開できるよう、並び順を固定する
+    query += order_by_clause()
+
+    page_size = (limit or DEFAULT_PAGE_SIZE) if paginate else None
+
+    # 同じ検索条件の結果がキャッシュにあれば Cosmos DB へのクエリを省略する
+    # 中分類ごとのビューは変更フィードで遅れて更新されるため、書き込み直後の古い結果を保持しないようキャッシュしない
+    use_cache = container.id != LOST_ITEM_BY_SUBCATEGORY_CONTAINER_NAME
+    cache_key = search_result_cache.make_key(criteria, continuation, page_size, selected_fields)
+    items = search_result_cache.get(cache_key) if use_cache else None
+    if items is None:
+        logger.info(f"Executing query on {container.id}: {query} with parameters {parameters} on partitions {partition_keys}")
+        try:
+            items = await query_lost_items(
+                container,
+                query,
+                parameters,
+                partition_keys=partition_keys,
+                page_size=page_size
+            )
+            logger.info(f"Retrieved {len(items)} items from Cosmos DB")
+        except Exception as e:
+            logger.error(f"Failed to execute query: {e}")
+            raise HTTPException(status_code=500, detail=f"データの取得に失敗しました: {str(e)}")
+        if use_cache:
+            search_result_cache.put(cache_key, criteria, items)
+    else:
+        logger.info(f"Returning {len(items)} cached items")
+
+    # ページが埋まっている場合のみ次ページがある可能性がある
+    next_continuation = None
+    if paginate and len(items) >= page_size:
+        next_continuation = encode_continuation(items)
+
+    # 自前のコンテナから読み込んだデータのため、Pydantic での再検証を省略して orjson で直接シリアライズする
+    # （fields を指定した場合は取得したフィールドのみを返す）
+    content = trusted_lost_items_response(items, projected=selected_fields is not None)
+    if not paginate:
+        return ORJSONResponse(content=content)
+    return ORJSONResponse(content={"items": content, "continuation": next_continuation})
+
+@app.get("/lostitems/stream")
+async def stream_lost_items(
+    free_text: Optional[str] = None,
+    municipality: Optional[List[str]] = Query(None),
+    itemName: Optional[str] = None,
+    color: Optional[str] = None,
+    findDate: Optional[str] = None,
+    isChecked: Optional[bool] = None,
+    fields: Optional[str] = None
+):
+    """
+    条件に一致する忘れ物データをすべて NDJSON（1行1件）で返す
+    Cosmos DB からページ単位で読み込み、取得したドキュメントから順に書き出す。
+    uvicorn などストリーミングに対応したサーバーでは、件数が多くてもメモリ使用量と最初のレスポンスまでの時間は一定に保たれる。
+    Azure Functions 上（azure-functions 1.12.0 の AsgiMiddleware）ではレスポンス全体がバッファされてから返されるため、
+    この効果は得られない（README の「制限事項」を参照）。
+    検索条件と `fields` は GET /lostitems と同じ（並び順は保証しない）。
+    """
+    try:
+        selected_fields = resolve_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"fields の指定が不正です: {str(e)}")
+
+    query = select_clause(selected_fields)
+    container, filters, parameters, partition_keys, criteria = await build_lost_item_filters(
+        free_text, municipality, itemName, color, findDate, isChecked
+    )
     if filters:
         query += " WHERE " + " AND ".join(filters)
 
-    logger.info(f"Executing query: {query} with parameters {parameters}")
+    logger.info(f"Executing streaming query on {container.id}: {query} with parameters {parameters} on partitions {partition_keys}")
 
+    # 最初のページはレスポンス開始前に取得し、クエリのエラーを 500 として返せるようにする
     try:
-        items = list(lost_items_container.query_items(
-            query=query,
-            parameters=parameters,
-            enable_cross_partition_query=True
-        ))
-        logger.info(f"Retrieved {len(items)} items from Cosmos DB")
+        pages = iter_lost_item_pages(
+            container,
+            query,
+            parameters,
+            partition_keys=partition_keys,
+            page_size=STREAM_PAGE_SIZE
+        )
+        try:
+            first_page = await pages.__anext__()
+        except StopAsyncIteration:
+            first_page = []
     except Exception as e:
         logger.error(f"Failed to execute query: {e}")
         raise HTTPException(status_code=500, detail=f"データの取得に失敗しました: {str(e)}")
 
-    if not items:
-        return []
+    async def generate():
+        count = len(first_page)
+        for item in first_page:
+            yield dumps_line(item)
+        try:
+            async for page in pages:
+                for item in page:
+                    count += 1
+                    yield dumps_line(item)
+        except Exception as e:
+            # 送信開始後はステータスコードを変更できないため、ログに記録して打ち切る
+            logger.error(f"Failed to stream lost items after {count} items: {e}")
+            return
+        logger.info(f"Streamed {count} items from Cosmos DB")
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
-    # Pydanticモデルに変換
-    try:
-        return [LostItem(**item) for item in items]
-    except Exception as e:
-        logger.error(f"Failed to convert data to Pydantic models: {e}")
-        raise HTTPException(status_code=500, detail=f"データの変換に失敗しました: {str(e)}")
-    
-    
 @app.post("/lostitems", response_model=LostItem)
 async def create_lost_item(item: LostItemRequest):
     """
@@ -175,9 +376,18 @@ async def create_lost_item(item: LostItemRequest):
         lost_item_data_encoded = jsonable_encoder(lost_item_data)
 
         # Cosmos DB にアイテムを追加
-        lost_items_container.create_item(body=lost_item_data_encoded)
+        lost_items_container = await get_lost_item_container()
+        await lost_items_container.create_item(body=lost_item_data_encoded)
+        search_result_cache.invalidate(lost_item_data_encoded)
         logger.info(f"Added lost item with ID: {lost_item_data['id']}")
 
+        # id → パーティションキーの対応表に登録（失敗しても読み取り時にクエリで補完される）
+        if lost_item_data_encoded.get("createUserPlace") is not None:
+            try:
+                await partition_key_index.put(lost_item_data["id"], lost_item_data_encoded["createUserPlace"])
+            except Exception as e:
+                logger.warning(f"Failed to index partition key for ID {lost_item_data['id']}: {e}")
+
         # Pydanticモデルに変換
         created_item = LostItem(**lost_item_data)
 
@@ -197,31 +407,32 @@ async def update_keywords(id: str, update_request: KeywordUpdateRequest):
     :return: 更新された忘れ物データ
     """
     try:
-        # アイテムを取得
-        query = f"SELECT * FROM c WHERE c.id = '{id}'"
-        items = list(lost_items_container.query_items(
-            query=query,
-            enable_cross_partition_query=True
-        ))
-        
-        if not items:
-            raise HTTPException(status_code=404, detail="アイテムが見つかりません")
+        # アイテムを取得（対応表からパーティションキーを引いてポイント読み取り）
+        item_to_update = await partition_key_index.read_lost_item(id)
 
-        # 最初の一致するアイテムを取得
-        item_to_update = items[0]
-        partition_key = item_to_update['createUserPlace']
-
-        # キーワードを更新
-        item_to_update['keyword'] = update_request.keyword
-        item_to_update['isChecked'] = True
+        if not item_to_update:
+            raise HTTPException(status_code=404, detail="アイテムが見つかりません")
 
-        # 更新をDBに反映
-        lost_items_container.replace_item(item=item_to_update['id'], body=item_to_update)
+        partition_key = item_to_update.get('createUserPlace')
+
+        # キーワードを更新し、更新をDBに反映
+        lost_items_container = await get_lost_item_container()
+        updated = await lost_items_container.patch_item(
+            item=id,
+            partition_key=partition_key,
+            patch_operations=[
+                {"op": "set", "path": "/keyword", "value": update_request.keyword},
+                {"op": "set", "path": "/isChecked", "value": True},
+            ]
+        )
+        search_result_cache.invalidate(item_to_update, updated)
 
         # Pydanticモデルに変換して返す
-        updated_item = LostItem(**item_to_update)
+        updated_item = LostItem(**updated)
         return updated_item
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to update keywords for item with ID {id}: {e}")
         raise HTTPException(status_code=500, detail=f"キーワードの更新に失敗しました: {str(e)}")
@@ -235,28 +446,36 @@ async def delete_lost_item(id: str):
     :param id: 削除する忘れ物データのID
     :return: 削除された忘れ物データ
     """
-    query = f"SELECT * FROM c WHERE c.id = '{id}'"
-    logger.info(f"Executing query: {query}")
-
     try:
-        items = list(lost_items_container.query_items(
-            query=query,
-            enable_cross_partition_query=True
-        ))
-        if not items:
+        # アイテムを取得（対応表からパーティションキーを引いてポイント読み取り）
+        item_to_delete = await partition_key_index.read_lost_item(id)
+        if not item_to_delete:
             raise HTTPException(status_code=404, detail="アイテムが見つかりません")
 
-        item_to_delete = items[0]
-        partition_key = item_to_delete['createUserPlace']  # 実際のパーティションキーのフィールド名に置き換えてください
-
-        # アイテムを削除
-        lost_items_container.delete_item(item=item_to_delete['id'], partition_key=partition_key)
+        partition_key = item_to_delete.get('createUserPlace')
+
+        # アイテムを論理削除（ttl 経過後に自動的に削除される。中分類ごとのビューからは変更フィードで削除される）
+        lost_items_container = await get_lost_item_container()
+        try:
+            await lost_items_container.patch_item(
+                item=item_to_delete['id'],
+                partition_key=partition_key,
+                patch_operations=tombstone_operations(),
+                filter_predicate=f"FROM c WHERE {NOT_DELETED_FILTER}"
+            )
+        except CosmosAccessConditionFailedError:
+            # 同時に削除された場合
+            raise HTTPException(status_code=404, detail="アイテムが見つかりません")
+        await partition_key_index.remove(id)
+        search_result_cache.invalidate(item_to_delete)
         logger.info(f"Deleted lost item with ID: {id}")
 
         # Pydanticモデルに変換して返す
         deleted_item = LostItem(**item_to_delete)
         return deleted_item
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to delete lost item: {e}")
         raise HTTPException(status_code=500, detail=f"アイテムの削除に失敗しました: {str(e)}")
@@ -268,14 +487,25 @@ async def delete_all_lost_items():
     登録されているすべての遺失物を削除するエンドポイント
     """
     try:
-        # Cosmos DB からすべてのアイテムを取得
-        items = list(lost_items_container.read_all_items())
-
-        # すべてのアイテムを削除
+        # Cosmos DB から削除されていないアイテムの id とパーティションキーを取得
+        lost_items_container = await get_lost_item_container()
+        items = [item async for item in lost_items_container.query_items(
+            query=f"SELECT c.id, c.createUserPlace FROM c WHERE {NOT_DELETED_FILTER}"
+        )]
+
+        # すべてのアイテムをパーティションキー（createUserPlace）ごとのバッチで論理削除
+        # （中分類ごとのビューからは変更フィードで削除される）
+        ids_by_partition = {}
         for item in items:
-            partition_key = item['createUserPlace']  # 実際のパーティションキーのフィールド名に置き換えてください
-            lost_items_container.delete_item(item=item['id'], partition_key=partition_key)
-            logger.info(f"Deleted lost item with ID: {item['id']}")
+            ids_by_partition.setdefault(item['createUserPlace'], []).append(item['id'])
+        await tombstone_items_by_partition(lost_items_container, ids_by_partition)
+
+        # アイテムの削除後に、id → パーティションキーの対応表をまとめて削除
+        await partition_key_index.remove_many(item['id'] for item in items)
+        logger.info(f"Deleted {len(items)} lost items")
+
+        partition_key_index.clear()
+        search_result_cache.clear()
 
         return {"message": "Deleted all lost items"}
 
@@ -284,18 +514,47 @@ async def delete_all_lost_items():
         raise HTTPException(status_code=500, detail=f"アイテムの削除に失敗しました: {str(e)}")
 
 @app.post("/imagescan")
-async def scan_image(image: UploadFile = File(...)):
+async def scan_image(image: UploadFile = File(...), item_type: Optional[str] = Form(None)):
     """
     画像をアップロードし、処理を行うエンドポイント
     :param image: アップロードされた画像ファイル
+    :param item_type: 分類が分かっている場合に指定する（タグの候補をその分類のラベルに絞り込む）
     :return: 処理結果
     """    
     try:
-        result = await chat_service.process_image(image)
+        result = await chat_service.process_image(image, item_type)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"画像の処理に失敗しました: {str(e)}")
 
+@app.post("/imagescan/batch")
+async def scan_images(images: List[UploadFile] = File(...), item_type: Optional[str] = Form(None)):
+    """
+    複数の画像をまとめて解析し、完了した順に結果を NDJSON で返すエンドポイント
+    Azure Functions 上（azure-functions 1.12.0 の AsgiMiddleware）ではレスポンス全体がバッファされるため、
+    結果はすべての画像の解析が終わってからまとめて返される（解析自体は並列に行う）
+    :param images: アップロードされた画像ファイル（最大 IMAGE_BATCH_MAX_FILES 件）
+    :param item_type: すべての画像の分類が同じ場合に指定する
+    :return: 1行に1画像の結果（index, filename, color, itemName, tags または error）
+    """
+    if len(images) > IMAGE_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"一度に解析できる画像は {IMAGE_BATCH_MAX_FILES} 件までです")
+
+    # アップロードされたファイルはレスポンスの送信前に閉じられるため、先に読み込んでおく
+    try:
+        uploads = [(image.filename, await image.read(), image.content_type) for image in images]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"画像の読み込みに失敗しました: {str(e)}")
+
+    async def generate():
+        count = 0
+        async for result in chat_service.process_images(uploads, item_type):
+            count += 1
+            yield dumps_line(result)
+        logger.info(f"Scanned {count} images in batch")
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @app.post("/upload-image")
 async def upload_image(image: UploadFile = File(...)):
     """
@@ -337,6 +596,9 @@ async def add_azure_lost_item(item: KeywordRequest):
 
         # Azure Table Storageに追加（非同期で実行）
         added_item = await add_lost_item_to_table_storage(lost_item_data)
+        keyword_snapshot.add(added_item.get("keyword"), added_item["PartitionKey"])
+        # キーワード一覧が変わったため、キーワードの解決結果を破棄
+        resolution_cache.invalidate(KEYWORD_RESOLUTION)
 
         logger.info(f"Added lost item with RowKey: {added_item['RowKey']}")
         return added_item
@@ -345,27 +607,91 @@ async def add_azure_lost_item(item: KeywordRequest):
         logger.error(f"Failed to add lost item to Azure Table Storage: {e}")
         raise HTTPException(status_code=500, detail=f"アイテムの追加に失敗しました: {str(e)}")
 
+@app.post("/labels/bulk")
+async def add_azure_lost_items_bulk(request: Request):
+    """
+    遺失物データ（ラベル）を Azure Table Storage に一括登録するエンドポイント
+    リクエストボディは JSON 配列（[{"keyword": ..., "itemType": ...}, ...]）または CSV（Content-Type: text/csv、1行目はヘッダー）
+    受信しながら1行ずつ検証し、分類（itemType）ごとにトランザクションでまとめて登録する
+    :return: 件数と行ごとの結果（row は 0 から始まる行番号。CSV ではヘッダーを除く）
+    """
+    start = time.perf_counter()
+    invalid_results = []
+    found_at = datetime.utcnow().isoformat()
+
+    async def valid_rows():
+        row = 0
+        try:
+            async for value in iter_label_rows(request.stream(), request.headers.get("content-type")):
+                if row >= LABELS_BULK_MAX_ROWS:
+                    invalid_results.append({"row": row, "status": "failed", "error": f"一度に登録できるのは {LABELS_BULK_MAX_ROWS} 行までです"})
+                    return
+                try:
+                    yield row, {**validate_label_row(value), "DateFound": found_at}
+                except ValueError as e:
+                    invalid_results.append({"row": row, "status": "failed", "error": str(e)})
+                row += 1
+        except ValueError as e:
+            # 形式が不正な場合は、それまでに受信した行のみを登録する
+            invalid_results.append({"row": row, "status": "failed", "error": str(e)})
+
+    try:
+        results = await add_lost_items_bulk(valid_rows())
+    except Exception as e:
+        logger.error(f"Failed to bulk add lost items to Azure Table Storage: {e}")
+        raise HTTPException(status_code=500, detail=f"アイテムの一括登録に失敗しました: {str(e)}")
+
+    results = sorted(results + invalid_results, key=lambda result: result["row"])
+    created = [result for result in results if result["status"] == "created"]
+
+    # キーワード一覧への反映とキーワードの解決結果の破棄は、最後に1回だけ行う
+    if created:
+        keyword_snapshot.add_many((result["keyword"], result["PartitionKey"]) for result in created)
+        resolution_cache.invalidate(KEYWORD_RESOLUTION)
+
+    duration = time.perf_counter() - start
+    logger.info(f"Bulk added {len(created)} of {len(results)} rows in {duration:.2f}s")
+    return {
+        "received": len(results),
+        "created": len(created),
+        "failed": len(results) - len(created),
+        "durationSeconds": round(duration, 3),
+        "results": results
+    }
+
 # 新しいエンドポイント：Azure Table Storageからラベルを一覧取得
 @app.get("/labels", response_model=List[str])
 async def get_azure_lost_items(
     item_type: Optional[str] = None,
     color: Optional[str] = None,
-    find_date: Optional[str] = None
+    find_date: Optional[str] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to")
 ):
     """
     Azure Table Storage から遺失物データを一覧取得するエンドポイント
     - `item_type`: アイテムの種類でフィルタリング
     - `color`: 色でフィルタリング
     - `find_date`: 指定日数以内でフィルタリング（today, yesterday, last_week, last_month）
+    - `from` / `to`: 登録日時の範囲でフィルタリング（from 以上 to 未満）
     """
     try:
+        # 分類のみの指定（または指定なし）の場合は、重複を除いたキーワードのテーブルから取得する
+        if not color and not find_date and not date_from and not date_to:
+            return await list_keywords(item_type)
+
         filters = {}
         if item_type:
-            filters["ItemType"] = item_type
+            # 分類は PartitionKey（キーワードのテーブルから取得する場合と同じ条件）
+            filters["PartitionKey"] = item_type
         if color:
             filters["Color"] = color
         if find_date:
             filters["findDate"] = find_date
+        if date_from:
+            filters["from"] = date_from
+        if date_to:
+            filters["to"] = date_to
 
         # Azure Table Storageからデータを取得（非同期で実行）
         items = await list_lost_items(filters)
@@ -386,14 +712,29 @@ async def delete_azure_lost_items():
     Azure Table Storage に登録されているすべての遺失物データを削除するエンドポイント
     """
     try:
-        await delete_all_labels()
+        result = await delete_all_labels()
+        keyword_snapshot.clear()
+        resolution_cache.invalidate(KEYWORD_RESOLUTION)
 
-        return {"message": "Deleted all labels"}
+        return {"message": "Deleted all labels", **result}
 
     except Exception as e:
         logger.error(f"Failed to delete all labels: {e}")
         raise HTTPException(status_code=500, detail=f"ラベルの削除に失敗しました: {str(e)}")
     
+@app.post("/labels/migrate")
+async def migrate_azure_lost_items():
+    """
+    旧形式（UUID）の RowKey で登録されている遺失物データを、時刻順の RowKey に移行するエンドポイント
+    移行前のデータは from / to / find_date による絞り込みの対象にならない
+    """
+    try:
+        return await migrate_row_keys()
+
+    except Exception as e:
+        logger.error(f"Failed to migrate labels: {e}")
+        raise HTTPException(status_code=500, detail=f"ラベルの移行に失敗しました: {str(e)}")
+
 # 新しいエンドポイント：Azure Table Storageからkeywordフィールドで特定のラベルを指定して削除
 @app.delete("/labels/{keyword}")
 async def delete_azure_lost_items_by_keyword(keyword: str):
@@ -403,9 +744,11 @@ async def delete_azure_lost_items_by_keyword(keyword: str):
     """
     try:
         # Azure Table Storageからデータを取得（非同期で実行）
-        await delete_lost_items_by_keyword(keyword)
+        result = await delete_lost_items_by_keyword(keyword)
+        keyword_snapshot.remove(keyword)
+        resolution_cache.invalidate(KEYWORD_RESOLUTION)
 
-        return {"message": f"Deleted all labels with keyword '{keyword}'"}
+        return {"message": f"Deleted all labels with keyword '{keyword}'", **result}
 
     except Exception as e:
         logger.error(f"Failed to delete labels with keyword '{keyword}': {e}")
@@ -421,6 +764,8 @@ async def select_keyword(free_text: str):
     try:
         keyword = await chat_service.select_closest_keyword(free_text)
         return {"keyword": keyword}
+    except NoKeywordsError as e:
+        raise HTTPException(status_code=404, detail=f"キーワードが見つかりませんでした: {str(e)}")
     except Exception as e:
         logger.error(f"Failed to select keyword: {e}")
         raise HTTPException(status_code=500, detail=f"キーワードの選択に失敗しました: {str(e)}")
@@ -508,18 +853,14 @@ async def process_lost_item_image(
     - **keyword**: 更新するキーワードのリスト（オプション）
     """
     try:
-        # 1. 遺失物データの取得
-        query = f"SELECT * FROM c WHERE c.id = '{id}'"
-        items = list(lost_items_container.query_items(
-            query=query,
-            enable_cross_partition_query=True
-        ))
-
-        if not items:
+        # 1. 遺失物データの取得（対応表からパーティションキーを引いてポイント読み取り）
+        item_to_update = await partition_key_index.read_lost_item(id)
+
+        if not item_to_update:
             raise HTTPException(status_code=404, detail="アイテムが見つかりません")
 
-        item_to_update = items[0]
-        partition_key = item_to_update.get('createUserPlace', '')  # パーティションキーの取得
+        partition_key = item_to_update.get('createUserPlace')  # パーティションキーの取得
+        original_item = dict(item_to_update)
 
         # 2. キーワードの決定
         if request.keyword:
@@ -587,12 +928,21 @@ async def process_lost_item_image(
         #             })
         #     return JSONResponse(status_code=400, content={"errors": errors})
 
-        # 5. Cosmos DBに更新を反映
-        lost_items_container.replace_item(item=item_to_update['id'], body=item_to_update)
+        # 5. Cosmos DBに更新を反映（変更するフィールドのみ部分更新）
+        lost_items_container = await get_lost_item_container()
+        updated = await lost_items_container.patch_item(
+            item=id,
+            partition_key=partition_key,
+            patch_operations=[
+                {"op": "set", "path": "/keyword", "value": item_to_update.get('keyword', [])},
+                {"op": "set", "path": "/isChecked", "value": True},
+            ]
+        )
+        search_result_cache.invalidate(original_item, updated)
         logger.info(f"Updated lost item with ID: {id}")
 
         # 6. Pydanticモデルに変換して返す
-        updated_item = LostItem(**item_to_update)
+        updated_item = LostItem(**updated)
         return updated_item
 
     except HTTPException as he:
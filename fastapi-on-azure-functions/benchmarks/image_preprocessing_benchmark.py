@@ -0,0 +1,79 @@
+# benchmarks/image_preprocessing_benchmark.py
+"""
+/imagescan で GPT に送信する画像の前処理（縮小・再エンコード）の効果を測定するベンチマーク
+
+    python benchmarks/image_preprocessing_benchmark.py [画像ファイル ...]
+
+画像を指定しない場合は、スマートフォンの写真を模した画像（4032x3024 などの JPEG / PNG）を生成して使用する。
+画像ごとに、前処理前後のバイト数・base64 後のリクエストサイズ・画像トークン数の目安・前処理時間を表示する。
+"""
+import base64
+import io
+import os
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from image_preprocessing import IMAGE_FORMAT, IMAGE_MAX_EDGE, estimate_vision_tokens, preprocess_image
+
+
+def make_photo(width: int, height: int, image_format: str) -> bytes:
+    """写真に近い（グラデーションとノイズを含む）画像を作成する"""
+    noise = Image.effect_noise((width, height), 40).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    image = Image.blend(noise, gradient, 0.5)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((width // 4, height // 4, width * 3 // 4, height * 3 // 4), fill=(30, 30, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=95)
+    return buffer.getvalue()
+
+
+def sample_images() -> List[Tuple[str, bytes]]:
+    return [
+        ("photo-12mp.jpg", make_photo(4032, 3024, "JPEG")),
+        ("photo-8mp.jpg", make_photo(3264, 2448, "JPEG")),
+        ("screenshot.png", make_photo(1170, 2532, "PNG")),
+        ("small.jpg", make_photo(480, 360, "JPEG")),
+    ]
+
+
+def main():
+    if len(sys.argv) > 1:
+        images = [(os.path.basename(path), open(path, "rb").read()) for path in sys.argv[1:]]
+    else:
+        images = sample_images()
+
+    print(f"max edge: {IMAGE_MAX_EDGE}, format: {IMAGE_FORMAT}")
+    print(f"{'image':>16} {'original':>10} {'prepared':>10} {'request':>16} {'tokens':>12} {'detail':>6} {'time':>8}")
+    total_before = total_after = total_time = 0
+    for name, contents in images:
+        with Image.open(io.BytesIO(contents)) as original:
+            original_tokens = estimate_vision_tokens(*original.size, "high")
+
+        start = time.perf_counter()
+        prepared = preprocess_image(contents)
+        elapsed = time.perf_counter() - start
+
+        request_before = len(base64.b64encode(contents))
+        request_after = len(base64.b64encode(prepared.data))
+        tokens = estimate_vision_tokens(prepared.width, prepared.height, prepared.detail)
+        total_before += request_before
+        total_after += request_after
+        total_time += elapsed
+        print(
+            f"{name:>16} {len(contents) / 1024:8.0f}KB {len(prepared.data) / 1024:8.0f}KB "
+            f"{request_before / 1024:6.0f}->{request_after / 1024:5.0f}KB "
+            f"{original_tokens:5d}->{tokens:5d} {prepared.detail:>6} {elapsed * 1000:6.1f}ms"
+        )
+
+    print(f"request bytes: {total_before / 1024:.0f}KB -> {total_after / 1024:.0f}KB "
+          f"({total_after / total_before:.1%}), preprocessing {total_time / len(images) * 1000:.1f}ms/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/serialization_benchmark.py
+"""
+GET /lostitems のレスポンス作成コストを、従来の方法と orjson による高速パスで比較するベンチマーク
+
+    python benchmarks/serialization_benchmark.py [件数]
+
+従来の方法: LostItem(**item) → response_model (List[LostItem]) での再検証 → JSON 化
+高速パス:   既定値の補完のみ → orjson でシリアライズ
+"""
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from pydantic import TypeAdapter
+
+from models import LostItem
+from serialization import trusted_lost_items_response
+
+PLACES = ["旭川市", "函館市", "小樽市", "千歳市", "苫小牧市", "室蘭市", "北見市", "札幌駅"]
+ITEM_NAMES = ["手提げかばん", "財布", "傘", "時計", "メガネ", "携帯電話", "カメラ", "鍵", "本", "アクセサリー", "携帯音響品"]
+COLORS = ["black", "red", "blue", "green", "yellow", "white", "gray", "brown"]
+# Cosmos DB に保存されている findDateTime の形式（クライアントによって異なる）
+DATE_FORMATS = [
+    lambda value: value.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+    lambda value: value.strftime("%Y-%m-%dT%H:%M"),
+    lambda value: value.isoformat() + "+09:00",
+    lambda value: value.isoformat(),
+    lambda value: None,
+]
+
+
+def make_documents(count: int) -> List[dict]:
+    """Cosmos DB から読み込んだ状態を模したドキュメントを作成する"""
+    base = datetime(2024, 11, 1)
+    documents = []
+    for i in range(count):
+        documents.append({
+            "createUserPlace": PLACES[i % len(PLACES)],
+            "findDateTime": DATE_FORMATS[i % len(DATE_FORMATS)](base - timedelta(minutes=i)),
+            "memo": f"メモ {i}",
+            "contact": "011-000-0000",
+            "color": {"id": COLORS[i % len(COLORS)], "name": COLORS[i % len(COLORS)], "url": "https://example.com/color.png"},
+            "createUserID": f"user{i % 50}",
+            "currency": {"foreignCurrency": None, "japaneseCurrency": [{"count": 1, "id": "1000"}]},
+            "findPlace": "改札口",
+            "imageUrl": [f"https://example.blob.core.windows.net/images/{i}.jpg"],
+            "isValuables": i % 3 == 0,
+            "item": {"categoryCode": "01", "categoryName": "かばん類", "itemName": ITEM_NAMES[i % len(ITEM_NAMES)], "valuableFlg": 0},
+            "keyword": ["黒", "革", "長財布"],
+            "mngmtNo": f"{i:08d}",
+            "personal": None,
+            "status": {"id": "1", "name": "保管中"},
+            "id": str(uuid.uuid4()),
+            "DateFound": (base - timedelta(minutes=i)).isoformat(),
+            "isChecked": True,
+            "_rid": "AAAAAAAAAAA=",
+            "_self": "dbs/AAAA==/colls/AAAA=/docs/AAAAAAAAAAA=/",
+            "_etag": "\"00000000-0000-0000-0000-000000000000\"",
+            "_attachments": "attachments/",
+            "_ts": 1730419200,
+        })
+    return documents
+
+
+def validated_path(documents: List[dict]) -> bytes:
+    """従来の方法（モデル作成 → response_model での検証 → JSON 化）"""
+    items = [LostItem(**document) for document in documents]
+    adapter = TypeAdapter(List[LostItem])
+    validated = adapter.validate_python(items, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    # JSONResponse.render と同じ設定
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def trusted_path(documents: List[dict]) -> bytes:
+    """高速パス（既定値の補完 → orjson）"""
+    return orjson.dumps(trusted_lost_items_response(documents))
+
+
+def measure(function, documents: List[dict], repeat: int = 3):
+    best = None
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = function(documents)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(body)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    documents = make_documents(count)
+
+    # 高速パスのレスポンスが従来の方法と同じ内容であることを確認する
+    if orjson.loads(trusted_path(documents)) != json.loads(validated_path(documents)):
+        raise SystemExit("trusted path output differs from validated path")
+
+    print(f"documents: {count}")
+    results = {}
+    for name, function in [("validated", validated_path), ("trusted", trusted_path)]:
+        elapsed, size = measure(function, documents)
+        results[name] = elapsed
+        print(f"{name:>10}: {elapsed * 1000:8.1f} ms total, {elapsed / count * 1e6:7.2f} us/item, {size / 1024:8.1f} KiB")
+    print(f"speedup: {results['validated'] / results['trusted']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 import os
-from openai import AzureOpenAI
+from openai_client import OpenAICallLimiter, create_async_client
 from fastapi import UploadFile
 import base64
-from typing import Dict, List, Optional
-from table_storage import list_lost_items
+import hashlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from keyword_snapshot import keyword_snapshot
+from keyword_index import KeywordVectorIndex, create_embedding_provider
+from local_resolver import LocalChoiceResolver, category_resolver, location_resolver, rank_by_relevance
+from llm_cache import resolution_cache, fingerprint, KEYWORD, CATEGORY, LOCATION
+from singleflight import SingleFlight
+from image_preprocessing import preprocess_image_async, estimate_vision_tokens
+from image_cache import image_analysis_cache
+import asyncio
 import logging
 import json
 from fastapi.encoders import jsonable_encoder
@@ -13,23 +21,21 @@ from fastapi.encoders import jsonable_encoder
 AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+# 埋め込みで絞り込むキーワードの候補数
+KEYWORD_TOP_K = int(os.getenv("KEYWORD_TOP_K", "5"))
+# 1位と2位の類似度の差がこの値以上であれば GPT を使用せずに1位を採用する
+KEYWORD_TIE_MARGIN = float(os.getenv("KEYWORD_TIE_MARGIN", "0.05"))
+# 一括画像解析で同時に解析する画像数
+IMAGE_BATCH_CONCURRENCY = int(os.getenv("IMAGE_BATCH_CONCURRENCY", "4"))
+# 画像解析のプロンプトに含めるキーワード一覧のトークン数の上限（目安）
+IMAGE_KEYWORD_TOKEN_BUDGET = int(os.getenv("IMAGE_KEYWORD_TOKEN_BUDGET", "1500"))
 
 # ロギングの設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class ChatService:
-    def __init__(self):
-        # Azure OpenAIのクライアントを作成
-        self.client = AzureOpenAI(
-            api_version="2023-07-01-preview",
-            azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        )
-
-    def select_category(self, message: str) -> str:
-        try:
-            # GPTに対して最も近い選択肢を探すプロンプト
-            prompt = """
+# GPTに対して最も近い中分類を選択肢から探すプロンプト
+CATEGORY_PROMPT = """
             ユーザーから言葉が入力されるので選択肢から最も近い言葉を1つ選んで返してください。
             選択肢にない場合でも、**選択肢の中から**最も近いものを選んでください。
 
@@ -68,32 +74,8 @@ class ChatService:
             本
             """
 
-            # Azure OpenAI APIを使用してプロンプトを送信
-            completion = self.client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT,  # デプロイ名（例: gpt-35-turbo）
-                messages=[
-                    {
-                        "role": "system",
-                        "content": prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": message,
-                    },
-                ],
-            )
-
-            # 応答の文章のみを取得
-            response_text = completion.choices[0].message.content.strip()
-            print(f"Response: {response_text}")
-            return response_text
-        except Exception as e:
-            return f"Error: {str(e)}"
-    
-    def select_location(self, message: str) -> str:
-        try:
-            # GPTに対して最も近い選択肢を探すプロンプト
-            prompt = """
+# GPTに対して最も近い場所を選択肢から探すプロンプト
+LOCATION_PROMPT = """
             ユーザーから言葉が入力されるので選択肢から最も近い言葉を1つ選んで返してください。
             選択肢にない場合でも、**選択肢の中から**最も近いものを選んでください。
 
@@ -129,49 +111,10 @@ class ChatService:
             千歳市
             """
 
-            # Azure OpenAI APIを使用してプロンプトを送信
-            completion = self.client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT,  # デプロイ名（例: gpt-35-turbo）
-                messages=[
-                    {
-                        "role": "system",
-                        "content": prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": message,
-                    },
-                ],
-            )
-
-            # 応答の文章のみを取得
-            response_text = completion.choices[0].message.content.strip()
-            print(f"Response: {response_text}")
-            return response_text
-        except Exception as e:
-            return f"Error: {str(e)}"
-
-    async def process_image(self, image: UploadFile) -> Dict:
-        try:
-            # 画像をバイナリデータとして非同期に読み込む
-            contents = await image.read()
-            
-            # 画像データをBase64エンコーディング
-            encoded_image = base64.b64encode(contents).decode('utf-8')
-            
-            # data URIスキームに従ってフォーマットする
-            image_data_uri = f"data:{image.content_type};base64,{encoded_image}"
-
-            # キーワードの一覧を取得
-            keywords = await self.get_keywords()
-            if not keywords:
-                return {"tags": [], "message": "キーワードが登録されていません。"}
-
-            # キーワード一覧をカンマ区切りの文字列に変換
-            keywords_str = ', '.join(keywords)
-
-            # プロンプトの作成
-            prompt = f"""
+# 画像から色・中分類・タグを抽出するプロンプト
+# 呼び出しごとに変わるキーワード一覧はユーザーメッセージに分け、システムプロンプトは常に同じ内容にする
+# （プロバイダー側のプロンプトキャッシュが効くように、このプロンプトを変更する場合もバイト列が変わらないよう定数で保持する）
+IMAGE_ANALYSIS_PROMPT = """
 あなたは画像の内容を分析し、以下の情報をJSON形式で抽出するアシスタントです。
 
 1. 画像から **color**（以下のリストから選択）を抽出してください。
@@ -180,84 +123,345 @@ class ChatService:
 2. 画像から **itemName**（以下のリストから選択）を抽出してください。
    - 選択肢: ['手提げかばん', '財布', '傘', '時計', 'メガネ', '携帯電話', 'カメラ', '鍵', '本', 'アクセサリー', '携帯音響品']
 
-3. 画像の特徴に応じて、以下のキーワード一覧から最も合致する1〜3つのタグを **tags** として選択してください。
-   - キーワード一覧: {keywords_str}
-   - 該当するキーワードがない場合は、空の配列を返してください。
+3. 画像の特徴に応じて、ユーザーが指定するキーワード一覧から最も合致する1〜3つのタグを **tags** として選択してください。
+   - キーワード一覧が指定されていない場合、または該当するキーワードがない場合は、空の配列を返してください。
 
 レスポンスのJSON形式:
-{{
+{
     "color": "colorの値",
     "itemName": "itemNameの値",
     "tags": ["タグ1", "タグ2", "タグ3"]
-}}
-
-画像を分析して、上記の情報を抽出してください。
+}
 """
 
-            # メッセージリストを作成
-            messages = [
+
+def estimate_text_tokens(text: str) -> int:
+    """
+    テキストのトークン数の目安（日本語は1文字あたり約1トークン、英数字は4文字あたり約1トークン）
+    """
+    ascii_count = sum(1 for ch in text if ch.isascii())
+    return (len(text) - ascii_count) + (ascii_count + 3) // 4
+
+
+def fit_keywords_to_budget(keywords: List[str], budget: int = IMAGE_KEYWORD_TOKEN_BUDGET) -> List[str]:
+    """
+    キーワード一覧をトークン数の上限に収まるように切り詰める
+    :param keywords: キーワードの候補（優先度の高い順）
+    :param budget: トークン数の上限
+    """
+    selected = []
+    used = 0
+    for keyword in keywords:
+        # 区切り文字（", "）の分を含める
+        tokens = estimate_text_tokens(keyword) + 1
+        if used + tokens > budget:
+            logger.warning(f"Keyword list truncated to {len(selected)} of {len(keywords)} keywords to fit the token budget")
+            break
+        selected.append(keyword)
+        used += tokens
+    return selected
+
+
+class NoKeywordsError(LookupError):
+    """キーワード（ラベル）が1件も登録されていない場合に送出される例外"""
+
+
+class ChatService:
+    def __init__(self):
+        # Azure OpenAIのクライアントを作成（接続プールを共有する非同期クライアント）
+        self.client = create_async_client()
+        # 同時実行数の制限と再試行を行うラッパー
+        self.limiter = OpenAICallLimiter()
+        # 同じ入力に対する同時の問い合わせを1回にまとめる
+        self.singleflight = SingleFlight()
+        # フリーワードとキーワードの類似度検索に使用するインデックス
+        # 埋め込みモデルのデプロイが無い場合は None（キーワード一覧全体を GPT に渡す）
+        embedding_provider = create_embedding_provider(self.client, self.limiter)
+        self.keyword_index = KeywordVectorIndex(embedding_provider) if embedding_provider else None
+
+    async def _create_completion(self, **kwargs):
+        """
+        チャット補完を同時実行数の制限・再試行・期限付きで実行する
+        """
+        return await self.limiter.call(
+            self.client.chat.completions.create,
+            model=AZURE_OPENAI_DEPLOYMENT,  # デプロイ名（例: gpt-35-turbo）
+            **kwargs
+        )
+
+    async def select_category_async(self, message: str) -> str:
+        """
+        入力に最も近い中分類を選択する（失敗時は例外を送出する）
+        """
+        return (
+            self._resolve_locally(category_resolver, message)
+            or await self._select_choice_cached_async(CATEGORY, CATEGORY_PROMPT, message)
+        )
+
+    async def select_location_async(self, message: str) -> str:
+        """
+        入力に最も近い場所を選択する（失敗時は例外を送出する）
+        """
+        return (
+            self._resolve_locally(location_resolver, message)
+            or await self._select_choice_cached_async(LOCATION, LOCATION_PROMPT, message)
+        )
+
+    async def _select_choice_cached_async(self, kind: str, prompt: str, message: str) -> str:
+        """
+        GPT の応答をキャッシュ経由で取得する
+        """
+        prompt_fingerprint = fingerprint([prompt])
+        cached = resolution_cache.get(kind, prompt_fingerprint, message)
+        if cached is not None:
+            return cached
+        response_text = await self.singleflight.do(
+            resolution_cache.make_key(kind, prompt_fingerprint, message),
+            lambda: self._select_choice_async(prompt, message)
+        )
+        resolution_cache.put(kind, prompt_fingerprint, message, response_text)
+        return response_text
+
+    def _resolve_locally(self, resolver: LocalChoiceResolver, message: str) -> Optional[str]:
+        """
+        正規化・別名辞書・あいまい一致で選択肢を決定する（一致度が低い場合は None を返し、GPT に問い合わせる）
+        """
+        choice, score = resolver.match(message)
+        if choice is not None and score >= resolver.threshold:
+            logger.info(f"Resolved locally: {message} -> {choice} (score={score:.2f})")
+            return choice
+        logger.info(f"Local resolution not confident for '{message}' (score={score:.2f}), falling back to GPT")
+        return None
+
+    async def _select_choice_async(self, prompt: str, message: str) -> str:
+        # エラー時は例外を送出し、呼び出し側でフォールバックできるようにする
+        # Azure OpenAI APIを使用してプロンプトを送信
+        completion = await self._create_completion(
+            messages=[
                 {
                     "role": "system",
-                    "content": "あなたは画像の内容を分析し、指定された情報を抽出するアシスタントです。"
+                    "content": prompt,
                 },
                 {
                     "role": "user",
-                    "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {
-                        "url": f"data:image/png;base64,{encoded_image}"}
-                    }
-                ]}
-            ]
-
-            # Azure OpenAIにリクエストを送信（同期メソッド）
-            completion = self.client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT,
-                messages=messages,
-                response_format= { "type":"json_object" },
-            )
+                    "content": message,
+                },
+            ],
+        )
 
-            # 応答のテキストを取得
-            response_text = completion.choices[0].message.content.strip()
-            logger.info(f"OpenAI response: {response_text}")
+        # 応答の文章のみを取得
+        response_text = completion.choices[0].message.content.strip()
+        logger.info(f"Response: {response_text}")
+        return response_text
 
-            # 応答をJSON形式に変換
-            response_data = json.loads(response_text)
+    async def process_image(self, image: UploadFile, item_type: Optional[str] = None) -> Dict:
+        """
+        画像から色・中分類・タグを抽出する
+        :param image: アップロードされた画像
+        :param item_type: 分類が分かっている場合は指定する（タグの候補をその分類のキーワードに絞り込む）
+        """
+        try:
+            # 画像をバイナリデータとして非同期に読み込む
+            contents = await image.read()
 
-            # color、itemName、tagsを取得
-            color = response_data.get("color", "")
-            itemName = response_data.get("itemName", "")
-            tags = response_data.get("tags", [])
+            # 同じ画像の解析が実行中であれば、その結果を共有する
+            image_hash = hashlib.sha256(contents).hexdigest()
+            return await self.singleflight.do(
+                f"image:{image_hash}:{item_type or ''}",
+                lambda: self._analyze_image(contents, image.content_type, item_type=item_type)
+            )
 
-            # tagsの数を確認し、0〜3個に制限
-            if not isinstance(tags, list):
-                tags = []
-            tags = tags[:3]  # 最大3つまで
+        except Exception as e:
+            logger.error(f"Failed to process image: {e}")
+            return {"error": str(e)}
 
-            result = {
-                "color": color,
-                "itemName": itemName,
-                "tags": tags
+    async def process_images(
+        self,
+        images: List[Tuple[str, bytes, Optional[str]]],
+        item_type: Optional[str] = None,
+        concurrency: int = IMAGE_BATCH_CONCURRENCY
+    ) -> AsyncIterator[Dict]:
+        """
+        複数の画像を並列に解析し、完了した順に結果を返す
+        :param images: (ファイル名, 画像のバイナリデータ, Content-Type) のリスト
+        :param item_type: すべての画像の分類が同じ場合に指定する
+        :param concurrency: 同時に解析する画像数
+        :return: 画像ごとの結果（index, filename と process_image と同じ項目）
+        """
+        # キーワードの一覧は最初に1回だけ取得する
+        keywords = await self.get_keywords()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def analyze(index: int, filename: str, contents: bytes, content_type: Optional[str]) -> Dict:
+            async with semaphore:
+                try:
+                    image_hash = hashlib.sha256(contents).hexdigest()
+                    result = await self.singleflight.do(
+                        f"image:{image_hash}:{item_type or ''}",
+                        lambda: self._analyze_image(contents, content_type, keywords, item_type)
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to process image '{filename}': {e}")
+                    result = {"error": str(e)}
+            return {"index": index, "filename": filename, **result}
+
+        tasks = [
+            asyncio.create_task(analyze(index, filename, contents, content_type))
+            for index, (filename, contents, content_type) in enumerate(images)
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # クライアントが切断した場合などは残りの解析を取り消す
+            for task in tasks:
+                task.cancel()
+
+    async def _analyze_image(
+        self,
+        contents: bytes,
+        content_type: Optional[str] = None,
+        keywords: Optional[List[str]] = None,
+        item_type: Optional[str] = None
+    ) -> Dict:
+        """
+        画像から色・中分類・タグを GPT で抽出する
+        :param contents: 画像のバイナリデータ
+        :param content_type: アップロード時の Content-Type
+        :param keywords: キーワードの一覧（省略時はスナップショットから取得）
+        :param item_type: 分類（指定した場合はタグの候補をその分類のキーワードに絞り込む）
+        """
+        # 画像を縮小・再エンコードする（CPU を使うためワーカープールで実行）
+        prepared = await preprocess_image_async(contents, content_type)
+        if prepared.width:
+            logger.info(
+                f"Prepared image: {len(contents)} -> {len(prepared.data)} bytes, "
+                f"{prepared.width}x{prepared.height} {prepared.mime_type}, detail={prepared.detail}, "
+                f"~{estimate_vision_tokens(prepared.width, prepared.height, prepared.detail)} tokens"
+            )
+
+        # キーワードの一覧を取得
+        if keywords is None:
+            keywords = await self.get_keywords()
+        if not keywords:
+            return {"tags": [], "message": "キーワードが登録されていません。"}
+
+        # 分類の表記ゆれを吸収する（例: かばん → 手提げかばん）
+        if item_type:
+            item_type = category_resolver.resolve(item_type) or item_type
+
+        # 同じキーワード一覧で解析済みの似た画像があれば、その結果を返す
+        keywords_version = f"{fingerprint(keywords)}:{item_type or ''}"
+        if prepared.dhash is not None:
+            cached = image_analysis_cache.get(keywords_version, prepared.dhash)
+            if cached is not None:
+                return cached
+
+        # 画像データをBase64エンコーディング
+        encoded_image = base64.b64encode(prepared.data).decode('utf-8')
+        image_content = {"type": "image_url", "image_url": {
+            "url": f"data:{prepared.mime_type};base64,{encoded_image}",
+            "detail": prepared.detail}
+        }
+
+        # タグの候補を分類（ラベルの PartitionKey）で絞り込む
+        first_response = None
+        hint = None
+        if item_type:
+            hint = item_type
+        elif estimate_text_tokens(", ".join(keywords)) > IMAGE_KEYWORD_TOKEN_BUDGET:
+            # キーワードが多すぎる場合は、先に中分類を判定してから、その分類のキーワードだけを渡す
+            # 中分類と色の判定には細部が不要なため、1回目は低解像度（detail=low、画像のトークン数は固定）で送る
+            # （分類を指定すれば1回目は不要になる）
+            low_detail_image = {**image_content, "image_url": {**image_content["image_url"], "detail": "low"}}
+            first_response = await self._request_image_analysis(low_detail_image, None)
+            hint = first_response.get("itemName")
+
+        if hint:
+            # 上限を超える場合に関連の低いキーワードから切り捨てられるよう、分類のキーワード → 分類なしのキーワードの順に、
+            # それぞれ分類との関連度の高い順に並べる
+            typed, untyped = await keyword_snapshot.get_groups_for_item_type(hint)
+            candidates = rank_by_relevance(typed, hint) + rank_by_relevance(untyped, hint)
+        elif first_response is not None:
+            candidates = []
+        else:
+            candidates = keywords
+        candidates = fit_keywords_to_budget(candidates)
+
+        if first_response is not None and not candidates:
+            response_data = first_response
+        else:
+            response_data = await self._request_image_analysis(image_content, candidates)
+
+        # color、itemName、tagsを取得
+        color = response_data.get("color", "")
+        itemName = response_data.get("itemName", "")
+        tags = response_data.get("tags", [])
+
+        # tagsの数を確認し、0〜3個に制限
+        if not isinstance(tags, list):
+            tags = []
+        tags = tags[:3]  # 最大3つまで
+
+        result = {
+            "color": color,
+            "itemName": itemName,
+            "tags": tags
+        }
+
+        # データをシリアライズ
+        result = jsonable_encoder(result)
+        if prepared.dhash is not None:
+            image_analysis_cache.put(keywords_version, prepared.dhash, result)
+        return result
+
+    async def _request_image_analysis(self, image_content: Dict, keywords: Optional[List[str]]) -> Dict:
+        """
+        画像の解析を GPT に依頼する
+        :param image_content: 画像（image_url 形式のメッセージ）
+        :param keywords: タグの候補（None の場合はタグを選ばず、色と中分類のみを判定させる）
+        """
+        if keywords is None:
+            text = "画像を分析して、color と itemName を抽出してください。"
+        else:
+            text = f"キーワード一覧: {', '.join(keywords)}\n\n画像を分析して、上記の情報を抽出してください。"
+
+        # メッセージリストを作成（システムプロンプトは固定）
+        messages = [
+            {
+                "role": "system",
+                "content": IMAGE_ANALYSIS_PROMPT
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": text},
+                    image_content
+                ]
             }
+        ]
 
-            # データをシリアライズ
-            return jsonable_encoder(result)
+        # Azure OpenAIにリクエストを送信
+        completion = await self._create_completion(
+            messages=messages,
+            response_format= { "type":"json_object" },
+        )
 
-        except Exception as e:
-            logger.error(f"Failed to process image: {e}")
-            return {"error": str(e)}
+        # 応答のテキストを取得
+        response_text = completion.choices[0].message.content.strip()
+        logger.info(f"OpenAI response: {response_text}")
 
-    def send_request_to_azure_openai(self, messages):
+        # 応答をJSON形式に変換
+        return json.loads(response_text)
+
+    async def send_request_to_azure_openai(self, messages):
         """
         Azure OpenAIにリクエストを送信し、レスポンスを取得する関数
         :param messages: メッセージリスト
         :return: OpenAIからのレスポンス
         """
         try:
-            completion = self.client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT,  # デプロイ名（例: gpt-35-turbo）
-                messages=messages
-            )
+            completion = await self._create_completion(messages=messages)
             response_text = completion.choices[0].message.content.strip()
             return {"message": response_text}
         except Exception as e:
@@ -281,64 +485,101 @@ class ChatService:
     
     async def get_keywords(self) -> List[str]:
         """
-        キーワードの一覧を取得する関数
+        キーワードの一覧を取得する関数（メモリ上のスナップショットから返す）
         """
-        try:
-            # Azure Table Storageから全アイテムを取得
-            items = await list_lost_items()
-            # 'keyword' フィールドを持つアイテムからキーワードを抽出し、重複を除外
-            keywords = list({item["keyword"] for item in items if "keyword" in item})
-            logger.info(f"Retrieved {len(keywords)} keywords.")
-            return keywords
-        except Exception as e:
-            logger.error(f"Failed to get keywords: {e}")
-            return []
+        keywords = await keyword_snapshot.get()
+        logger.info(f"Retrieved {len(keywords)} keywords.")
+        return keywords
 
     async def select_closest_keyword(self, free_text: str) -> str:
         """
-        フリーワードからキーワードリスト内で最も近いものを選択して返す関数
+        フリーワードからキーワードリスト内で最も近いものを選択して返す関数（失敗時は例外を送出する）
         :param free_text: ユーザーからのフリーワード入力
         :return: 最も近いキーワード
+        :raises NoKeywordsError: キーワードが登録されていない場合
         """
-        try:
-            # キーワードの一覧を取得
-            keywords = await self.get_keywords()
-            if not keywords:
-                return "キーワードが見つかりませんでした。"
+        # キーワードの一覧を取得
+        keywords = await self.get_keywords()
+        if not keywords:
+            raise NoKeywordsError("キーワードが登録されていません")
+
+        # 同じキーワード一覧に対して解決済みの入力であればキャッシュを返す
+        keywords_fingerprint = fingerprint(keywords)
+        cached = resolution_cache.get(KEYWORD, keywords_fingerprint, free_text)
+        if cached is not None:
+            logger.info(f"Selected keyword (cached): {cached}")
+            return cached
+
+        # 同じ入力の問い合わせが実行中であれば、その結果を共有する
+        response_text = await self.singleflight.do(
+            resolution_cache.make_key(KEYWORD, keywords_fingerprint, free_text),
+            lambda: self._resolve_keyword(free_text, keywords)
+        )
+        resolution_cache.put(KEYWORD, keywords_fingerprint, free_text, response_text)
+        return response_text
 
-            # キーワード一覧をカンマ区切りの文字列に変換
-            keywords_str = ', '.join(keywords)
+    async def _select_keyword_with_gpt(self, free_text: str, keywords: List[str]) -> str:
+        """
+        キーワードの候補から最も近いものを GPT で選択する
+        :param free_text: ユーザーからのフリーワード入力
+        :param keywords: キーワードの候補
+        """
+        # キーワード一覧をカンマ区切りの文字列に変換
+        keywords_str = ', '.join(keywords)
 
-            # プロンプトの作成
-            prompt = f"""
-            ユーザーからフリーワードが入力されるので、以下のキーワードのリストから最も近いキーワードを1つ選んで返してください。
-            キーワード一覧:
-            {keywords_str}
+        # プロンプトの作成
+        prompt = f"""
+        ユーザーからフリーワードが入力されるので、以下のキーワードのリストから最も近いキーワードを1つ選んで返してください。
+        キーワード一覧:
+        {keywords_str}
 
-            フリーワード: {free_text}
+        フリーワード: {free_text}
 
-            レスポンスはキーワードのみを返してください。
-            """
+        レスポンスはキーワードのみを返してください。
+        """
 
-            # Azure OpenAI APIを使用してプロンプトを送信
-            completion = self.client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "あなたはユーザーの入力に最も適したキーワードをキーワード一覧から選択するアシスタントです。",
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    },
-                ],
-            )
+        # Azure OpenAI APIを使用してプロンプトを送信
+        completion = await self._create_completion(
+            messages=[
+                {
+                    "role": "system",
+                    "content": "あなたはユーザーの入力に最も適したキーワードをキーワード一覧から選択するアシスタントです。",
+                },
+                {
+                    "role": "user",
+                    "content": prompt,
+                },
+            ],
+        )
 
-            # 応答のキーワードを取得
-            response_text = completion.choices[0].message.content.strip()
-            logger.info(f"Selected keyword: {response_text}")
-            return response_text
-        except Exception as e:
-            logger.error(f"Failed to select closest keyword: {e}")
-            return f"エラーが発生しました: {str(e)}"
\ No newline at end of file
+        # 応答のキーワードを取得
+        response_text = completion.choices[0].message.content.strip()
+        logger.info(f"Selected keyword: {response_text}")
+        return response_text
+
+    async def _resolve_keyword(self, free_text: str, keywords: List[str]) -> str:
+        """
+        埋め込みの類似度と GPT でフリーワードに最も近いキーワードを選択する
+        :param free_text: ユーザーからのフリーワード入力
+        :param keywords: キーワードの一覧
+        """
+        # 埋め込みの類似度で候補を絞り込む（埋め込みが無い・失敗した場合はキーワード一覧全体を GPT に渡す）
+        candidates = None
+        if self.keyword_index is not None:
+            try:
+                candidates = await self.keyword_index.search(free_text, keywords, KEYWORD_TOP_K)
+            except Exception as e:
+                logger.warning(f"Keyword embedding search failed, falling back to the full keyword list: {e}")
+
+        if candidates is None:
+            response_text = await self._select_keyword_with_gpt(free_text, keywords)
+        elif len(candidates) == 1 or candidates[0][1] - candidates[1][1] >= KEYWORD_TIE_MARGIN:
+            response_text = candidates[0][0]
+            logger.info(f"Selected keyword by similarity: {response_text} (score={candidates[0][1]:.3f})")
+        else:
+            # 類似度が拮抗している場合のみ、上位の候補から GPT に選ばせる
+            names = [keyword for keyword, _ in candidates]
+            response_text = await self._select_keyword_with_gpt(free_text, names)
+            if response_text not in names:
+                response_text = names[0]
+        return response_text
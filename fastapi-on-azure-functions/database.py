@@ -1,37 +1,253 @@
 import os
-from azure.cosmos import CosmosClient, PartitionKey
-from azure.identity import DefaultAzureCredential
+import asyncio
+import logging
+import weakref
+from azure.cosmos import PartitionKey
+from azure.cosmos.aio import CosmosClient
+from azure.cosmos.exceptions import CosmosBatchOperationError, CosmosResourceNotFoundError
+from azure.identity.aio import DefaultAzureCredential
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # 環境変数から Cosmos DB の接続情報を取得
 COSMOS_ENDPOINT = os.getenv("COSMOS_ENDPOINT")
 DATABASE_NAME = "MaterializedViewsDB"
 LOST_ITEMS_CONTAINER_NAME = "LostItems"
 LOST_ITEM_BY_SUBCATEGORY_CONTAINER_NAME = "LostItemsBySubcategory"
+LOST_ITEM_PARTITION_INDEX_CONTAINER_NAME = "LostItemPartitionIndex"
+
+# 検索結果の並び順（findDateTime, id の降順）に必要な複合インデックス
+# 作成済みのコンテナへの追加は、README の手順（az cosmosdb sql container update）で行う
+SORT_COMPOSITE_INDEX = [
+    {"path": "/findDateTime", "order": "descending"},
+    {"path": "/id", "order": "descending"},
+]
+
+# 削除済みを表すフィールド（論理削除）。削除は LostItems のドキュメントにこのフィールドと ttl を設定して行い、
+# 変更フィードで LostItemsBySubcategory に伝える（ビューから直接削除すると、処理中の変更フィードが削除後に書き戻すため）
+DELETED_FIELD = "deleted"
+# 論理削除したドキュメントが自動的に削除されるまでの秒数（変更フィードの処理の遅れより十分に長くする）
+LOST_ITEM_TOMBSTONE_TTL_SECONDS = int(os.getenv("LOST_ITEM_TOMBSTONE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+# 論理削除したドキュメントを除外する WHERE 句
+NOT_DELETED_FILTER = f"NOT IS_DEFINED(c.{DELETED_FIELD})"
+
+# トランザクションバッチ1回あたりの最大操作数（Cosmos DB の上限は 100）
+COSMOS_BATCH_SIZE = min(100, int(os.getenv("COSMOS_BATCH_SIZE", "100")))
+# 並列に送信するリクエスト（バッチ・削除・更新）の最大数
+COSMOS_BATCH_CONCURRENCY = int(os.getenv("COSMOS_BATCH_CONCURRENCY", "8"))
+
+# Cosmos DB クライアント（非同期）はイベントループごとに1つだけ生成し、そのループ上の全リクエストで共有する
+# 接続プールはクライアント内部の aiohttp セッションで管理される
+# HTTP（AsgiMiddleware のループ）と変更フィードのトリガー（ワーカーのループ）は別のループで動くため、
+# 他のループで生成したクライアント・ロックを使用しないよう、ループごとに分けて保持する
+# クライアントは明示的には閉じず、プロセスの終了時に接続が解放される
+
+
+class _CosmosState:
+    """1つのイベントループで共有する Cosmos DB クライアントとコンテナ"""
+
+    def __init__(self):
+        self.client = None
+        self.lost_items_container = None
+        self.lost_item_by_subcategory_container = None
+        self.lost_item_partition_index_container = None
+        self.init_lock = asyncio.Lock()
+
+
+# イベントループ -> _CosmosState（ループが破棄されると自動的に削除される）
+_states = weakref.WeakKeyDictionary()
+
+
+def _state() -> _CosmosState:
+    """実行中のイベントループの状態を返す"""
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None:
+        state = _states[loop] = _CosmosState()
+    return state
+
+
+async def _check_container_settings(container, require_ttl: bool = False):
+    """
+    コンテナのインデックスポリシーに並び順の複合インデックスがあるか（require_ttl の場合は TTL が有効か）を確認し、
+    無い場合は警告を記録する
+    （コンテナの設定の変更はコントロールプレーンの操作のため、データプレーンのロールで動くアプリケーションからは行わない）
+    """
+    try:
+        properties = await container.read()
+    except Exception as e:
+        logger.warning(f"Failed to read indexing policy of container '{container.id}': {e}")
+        return
+
+    composite_indexes = (properties.get("indexingPolicy") or {}).get("compositeIndexes") or []
+    if SORT_COMPOSITE_INDEX not in composite_indexes:
+        logger.warning(
+            f"Container '{container.id}' has no composite index on (findDateTime DESC, id DESC); "
+            "sorted queries will fail until it is added (see README: az cosmosdb sql container update)"
+        )
+    if require_ttl and properties.get("defaultTtl") is None:
+        logger.warning(
+            f"Container '{container.id}' has TTL disabled; deleted items will not expire "
+            "until it is enabled (see README: az cosmosdb sql container update --ttl -1)"
+        )
+
+
+async def _initialize(state: _CosmosState):
+    """Cosmos DB クライアントとコンテナを、ループごとの初回アクセス時に初期化する"""
+    async with state.init_lock:
+        if state.client is not None:
+            return
+
+        credential = DefaultAzureCredential()
+        client = CosmosClient(COSMOS_ENDPOINT, credential)
+        await client.__aenter__()
+
+        database = await client.create_database_if_not_exists(id=DATABASE_NAME)
+
+        # LostItems コンテナ
+        lost_items_container = await database.create_container_if_not_exists(
+            id=LOST_ITEMS_CONTAINER_NAME,
+            partition_key=PartitionKey(path="/createUserPlace"),
+            indexing_policy={"compositeIndexes": [SORT_COMPOSITE_INDEX]},
+            # 論理削除したドキュメントのみ ttl で削除する（-1: 既定では期限なし）
+            default_ttl=-1,
+            offer_throughput=400
+        )
+        await _check_container_settings(lost_items_container, require_ttl=True)
+
+        # LostItemBySubcategory コンテナ
+        lost_item_by_subcategory_container = await database.create_container_if_not_exists(
+            id=LOST_ITEM_BY_SUBCATEGORY_CONTAINER_NAME,
+            partition_key=PartitionKey(path="/Subcategory"),
+            indexing_policy={"compositeIndexes": [SORT_COMPOSITE_INDEX]},
+            offer_throughput=400
+        )
+        await _check_container_settings(lost_item_by_subcategory_container)
 
-# Cosmos DB クライアントの初期化
-credential = DefaultAzureCredential()
-client = CosmosClient(COSMOS_ENDPOINT, credential)
+        # LostItemPartitionIndex コンテナ（id → createUserPlace の対応表。ポイント読み取り用）
+        lost_item_partition_index_container = await database.create_container_if_not_exists(
+            id=LOST_ITEM_PARTITION_INDEX_CONTAINER_NAME,
+            partition_key=PartitionKey(path="/id"),
+            offer_throughput=400
+        )
 
-database = client.create_database_if_not_exists(id=DATABASE_NAME)
+        state.lost_items_container = lost_items_container
+        state.lost_item_by_subcategory_container = lost_item_by_subcategory_container
+        state.lost_item_partition_index_container = lost_item_partition_index_container
+        state.client = client
 
-# LostItems コンテナ
-lost_items_container = database.create_container_if_not_exists(
-    id=LOST_ITEMS_CONTAINER_NAME,
-    partition_key=PartitionKey(path="/createUserPlace"),
-    offer_throughput=400
-)
 
-# LostItemBySubcategory コンテナ
-lost_item_by_subcategory_container = database.create_container_if_not_exists(
-    id=LOST_ITEM_BY_SUBCATEGORY_CONTAINER_NAME,
-    partition_key=PartitionKey(path="/Subcategory"),
-    offer_throughput=400
-)
+async def _initialized_state() -> _CosmosState:
+    state = _state()
+    if state.client is None:
+        await _initialize(state)
+    return state
 
-def get_lost_item_container():
+
+async def get_lost_item_container():
     """LostItems コンテナを返す"""
-    return lost_items_container
+    return (await _initialized_state()).lost_items_container
+
 
-def get_lost_item_by_subcategory_container():
+async def get_lost_item_by_subcategory_container():
     """LostItemBySubcategory コンテナを返す"""
-    return lost_item_by_subcategory_container
+    return (await _initialized_state()).lost_item_by_subcategory_container
+
+
+async def get_lost_item_partition_index_container():
+    """LostItemPartitionIndex コンテナを返す"""
+    return (await _initialized_state()).lost_item_partition_index_container
+
+
+async def _delete_ignoring_missing(container, id: str, partition_key):
+    try:
+        await container.delete_item(item=id, partition_key=partition_key)
+    except CosmosResourceNotFoundError:
+        pass
+
+
+async def _execute_by_partition(container, items_by_partition: dict, make_operation, execute_one):
+    """
+    パーティションキーごとにまとめたアイテムに、最大 COSMOS_BATCH_SIZE 件のトランザクションバッチで操作を行う
+    バッチは COSMOS_BATCH_CONCURRENCY 件まで並列に送信する。
+    既に削除されたアイテムを含むなどでバッチが失敗した場合は、そのバッチのみ1件ずつ実行する（存在しないアイテムは無視する）
+    :param items_by_partition: パーティションキー -> id のリスト
+    :param make_operation: id からバッチの操作を作成する関数
+    :param execute_one: (id, パーティションキー) で1件ずつ実行するコルーチン関数
+    """
+    semaphore = asyncio.Semaphore(COSMOS_BATCH_CONCURRENCY)
+
+    async def execute_chunk(partition_key, ids: list):
+        async with semaphore:
+            try:
+                await container.execute_item_batch(
+                    batch_operations=[make_operation(id) for id in ids],
+                    partition_key=partition_key
+                )
+            except CosmosBatchOperationError:
+                for id in ids:
+                    try:
+                        await execute_one(id, partition_key)
+                    except CosmosResourceNotFoundError:
+                        pass
+
+    await asyncio.gather(*[
+        execute_chunk(partition_key, ids[start:start + COSMOS_BATCH_SIZE])
+        for partition_key, ids in items_by_partition.items()
+        for start in range(0, len(ids), COSMOS_BATCH_SIZE)
+    ])
+
+
+async def delete_items_by_partition(container, items_by_partition: dict):
+    """
+    パーティションキーごとにまとめたアイテムを、トランザクションバッチで削除する
+    :param container: 削除対象のコンテナ
+    :param items_by_partition: パーティションキー -> id のリスト
+    """
+    await _execute_by_partition(
+        container,
+        items_by_partition,
+        lambda id: ("delete", (id,)),
+        lambda id, partition_key: container.delete_item(item=id, partition_key=partition_key)
+    )
+
+
+def tombstone_operations() -> list:
+    """論理削除（削除済みのフィールドと ttl の設定）の部分更新の操作"""
+    return [
+        {"op": "set", "path": f"/{DELETED_FIELD}", "value": True},
+        {"op": "set", "path": "/ttl", "value": LOST_ITEM_TOMBSTONE_TTL_SECONDS},
+    ]
+
+
+async def tombstone_items_by_partition(container, items_by_partition: dict):
+    """
+    パーティションキーごとにまとめたアイテムを、トランザクションバッチで論理削除する
+    :param container: LostItems コンテナ
+    :param items_by_partition: パーティションキー -> id のリスト
+    """
+    operations = tombstone_operations()
+    await _execute_by_partition(
+        container,
+        items_by_partition,
+        lambda id: ("patch", (id, operations)),
+        lambda id, partition_key: container.patch_item(item=id, partition_key=partition_key, patch_operations=operations)
+    )
+
+
+async def delete_items(container, ids: list):
+    """
+    /id でパーティション分割されたコンテナのアイテムを、COSMOS_BATCH_CONCURRENCY 件まで並列に削除する
+    （アイテムごとにパーティションが異なるため、トランザクションバッチにはまとめられない）
+    :param container: 削除対象のコンテナ
+    :param ids: 削除する id のリスト（存在しない id は無視する）
+    """
+    semaphore = asyncio.Semaphore(COSMOS_BATCH_CONCURRENCY)
+
+    async def delete(id: str):
+        async with semaphore:
+            await _delete_ignoring_missing(container, id, id)
+
+    await asyncio.gather(*[delete(id) for id in ids])
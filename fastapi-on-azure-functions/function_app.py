@@ -1,5 +1,23 @@
 import azure.functions as func
 
 from WrapperFunction import app as fastapi_app
+from database import DATABASE_NAME, LOST_ITEMS_CONTAINER_NAME
+import subcategory_projector
 
 app = func.AsgiFunctionApp(app=fastapi_app, http_auth_level=func.AuthLevel.ANONYMOUS)
+
+
+# LostItems の変更フィードから LostItemsBySubcategory（中分類ごとのビュー）を更新する（論理削除されたドキュメントはビューから削除する）
+# 処理位置は leases コンテナにチェックポイントとして保存される
+@app.cosmos_db_trigger(
+    arg_name="documents",
+    database_name=DATABASE_NAME,
+    collection_name=LOST_ITEMS_CONTAINER_NAME,
+    connection_string_setting="CosmosDBConnection",
+    lease_collection_name="leases",
+    lease_collection_prefix="LostItemsBySubcategory",
+    create_lease_collection_if_not_exists=True,
+    start_from_beginning=True
+)
+async def project_lost_items_by_subcategory(documents: func.DocumentList):
+    await subcategory_projector.project(document.to_dict() for document in documents)
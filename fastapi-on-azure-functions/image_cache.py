@@ -0,0 +1,166 @@
+# image_cache.py
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 環境変数からキャッシュの設定を取得
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "512"))
+# 同じ画像とみなす知覚ハッシュのハミング距離の上限（64 ビット中）
+IMAGE_CACHE_MAX_DISTANCE = int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "6"))
+# 指定した場合、解析結果を JSON ファイルにも保存し、コールドスタート後も再利用する（例: /tmp/image_cache.json）
+IMAGE_CACHE_PATH = os.getenv("IMAGE_CACHE_PATH")
+# 変更を永続化ファイルに書き出すまでの待ち時間（秒）。この間の変更はまとめて1回で書き出す
+IMAGE_CACHE_SAVE_DELAY_SECONDS = float(os.getenv("IMAGE_CACHE_SAVE_DELAY_SECONDS", "5"))
+
+
+class ImageAnalysisCache:
+    """
+    画像の解析結果（color, itemName, tags）を知覚ハッシュで保持するキャッシュ（LRU）
+    キーワード一覧のバージョンごとに保持し、ハミング距離が近い画像（同じ物の撮り直しなど）の結果を再利用する
+    永続化ファイルへの書き出しは save_delay 秒ごとにまとめ、イベントループを止めないよう別スレッドで行う
+    （プロセスが終了すると、書き出し前の変更は失われる）。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = IMAGE_CACHE_MAX_ENTRIES,
+        max_distance: int = IMAGE_CACHE_MAX_DISTANCE,
+        path: Optional[str] = IMAGE_CACHE_PATH,
+        save_delay: float = IMAGE_CACHE_SAVE_DELAY_SECONDS
+    ):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.path = path
+        self.save_delay = save_delay
+        self._entries = OrderedDict()  # (keywords_version, dhash) -> result
+        self._dirty = False
+        self._save_task: Optional[asyncio.Task] = None
+        self.saves = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def get(self, keywords_version: str, dhash: int) -> Optional[dict]:
+        """
+        ハミング距離が max_distance 以内で最も近い画像の解析結果を返す（無い場合は None）
+        :param keywords_version: キーワード一覧のフィンガープリント
+        :param dhash: 画像の知覚ハッシュ
+        """
+        best_key, best_distance = None, self.max_distance + 1
+        for key in self._entries:
+            version, cached_hash = key
+            if version != keywords_version:
+                continue
+            distance = (cached_hash ^ dhash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+                if distance == 0:
+                    break
+
+        if best_key is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(best_key)
+        self.hits += 1
+        logger.info(f"Image analysis cache hit (distance={best_distance})")
+        return dict(self._entries[best_key])
+
+    def put(self, keywords_version: str, dhash: int, result: dict):
+        """
+        解析結果をキャッシュに登録する
+        """
+        if self.max_entries <= 0:
+            return
+
+        key = (keywords_version, dhash)
+        # 呼び出し側で変更されても、別スレッドでの書き出し中の内容が変わらないよう複製して保持する
+        self._entries[key] = dict(result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._schedule_save()
+
+    def _load(self):
+        """永続化ファイルからエントリを読み込む"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for version, dhash, result in json.load(f):
+                    self._entries[(version, dhash)] = result
+            logger.info(f"Loaded {len(self._entries)} cached image analyses from {self.path}")
+        except Exception as e:
+            logger.warning(f"Failed to load image analysis cache from {self.path}: {e}")
+
+    def _schedule_save(self):
+        """
+        永続化ファイルへの書き出しを予約する（予約済みの場合は、その書き出しに含める）
+        イベントループの外から呼び出された場合は、その場で書き出す
+        """
+        if not self.path:
+            return
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._save()
+            return
+        # 別のループ（終了済みのループなど）で予約したタスクは待たずに、このループで予約し直す
+        if self._save_task is None or self._save_task.done() or self._save_task.get_loop() is not loop:
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(self.save_delay)
+        while self._dirty:
+            self._dirty = False
+            # エントリの一覧はループ上で作成し、JSON 化とファイルの書き込みのみ別スレッドで行う
+            await asyncio.to_thread(self._write, self._snapshot())
+
+    def _snapshot(self) -> list:
+        return [[version, dhash, result] for (version, dhash), result in self._entries.items()]
+
+    def _save(self):
+        """永続化ファイルにすぐに書き出す"""
+        if not self.path:
+            return
+        self._dirty = False
+        self._write(self._snapshot())
+
+    def _write(self, entries: list):
+        """永続化ファイルに書き出す（一時ファイルに書いてから置き換える）"""
+        try:
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(temporary_path, self.path)
+            self.saves += 1
+        except Exception as e:
+            logger.warning(f"Failed to save image analysis cache to {self.path}: {e}")
+
+    def stats(self) -> dict:
+        """ヒット率などの統計情報を返す"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "maxDistance": self.max_distance,
+            "persistent": bool(self.path),
+            "saves": self.saves,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+image_analysis_cache = ImageAnalysisCache()
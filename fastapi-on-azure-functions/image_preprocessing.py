@@ -0,0 +1,140 @@
+# image_preprocessing.py
+import asyncio
+import io
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 環境変数から前処理の設定を取得
+# 長辺の最大ピクセル数（これより大きい画像は縮小する）
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+# 再エンコードの形式（JPEG または WEBP）と品質
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+# GPT に渡す detail（low / high / auto）。auto の場合は縮小後のサイズから決める
+IMAGE_DETAIL = os.getenv("IMAGE_DETAIL", "auto").lower()
+# 前処理を実行するワーカースレッド数（Pillow のデコード・縮小・エンコードは GIL を解放する）
+IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png", "GIF": "image/gif"}
+
+# detail: low で十分なサイズ（OpenAI の低解像度モードは 512px 四方で処理される）
+LOW_DETAIL_MAX_EDGE = 512
+
+
+class PreparedImage(NamedTuple):
+    """GPT に送信する画像"""
+    data: bytes
+    mime_type: str
+    detail: str
+    width: Optional[int]
+    height: Optional[int]
+    # 縮小後の画像の知覚ハッシュ（dHash, 64 ビット）
+    dhash: Optional[int] = None
+
+
+def estimate_vision_tokens(width: int, height: int, detail: str) -> int:
+    """
+    画像の入力トークン数の目安を計算する（OpenAI のタイル計算方式）
+    """
+    if detail == "low":
+        return 85
+    # 2048px 四方に収めた後、短辺を 768px にしてから 512px のタイル数を数える
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def difference_hash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    画像の知覚ハッシュ（dHash）を計算する。似た画像ほどハミング距離が小さくなる
+    :param image: 向きを補正済みの画像
+    """
+    pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            left = pixels[row * (hash_size + 1) + column]
+            right = pixels[row * (hash_size + 1) + column + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def choose_detail(width: int, height: int) -> str:
+    if IMAGE_DETAIL in ("low", "high"):
+        return IMAGE_DETAIL
+    return "low" if max(width, height) <= LOW_DETAIL_MAX_EDGE else "high"
+
+
+def preprocess_image(
+    contents: bytes,
+    content_type: Optional[str] = None,
+    max_edge: int = IMAGE_MAX_EDGE,
+    image_format: str = IMAGE_FORMAT,
+    quality: int = IMAGE_QUALITY
+) -> PreparedImage:
+    """
+    画像をデコードし、EXIF の向きを補正して長辺 max_edge 以下に縮小し、JPEG / WebP に再エンコードする
+    CPU を使う処理のため、非同期処理からはスレッドで実行すること
+    :param contents: アップロードされた画像のバイナリデータ
+    :param content_type: アップロード時の Content-Type（デコードできない場合に使用）
+    """
+    try:
+        image = Image.open(io.BytesIO(contents))
+        original_format = image.format
+        rotated = image.getexif().get(0x0112, 1) != 1
+        # 縮小したかどうかは、draft で縮小される前の元のサイズで判定する
+        original_size = image.size
+        # JPEG はデコード時に縮小して読み込む（フル解像度でのデコードを避ける）
+        image.draft("RGB", (max_edge, max_edge))
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning(f"Could not decode image, sending it as uploaded: {e}")
+        return PreparedImage(contents, content_type or "application/octet-stream", "auto", None, None)
+
+    resized = max(original_size) > max_edge
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    # JPEG は透過を扱えないため、白背景に合成する
+    if image_format == "JPEG" and image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality)
+    data = buffer.getvalue()
+    width, height = image.size
+    dhash = difference_hash(image)
+
+    # 縮小・回転が不要で元の方が小さい場合は、元の画像をそのまま使用する
+    if not resized and not rotated and len(contents) <= len(data) and original_format in MIME_TYPES:
+        return PreparedImage(contents, MIME_TYPES[original_format], choose_detail(width, height), width, height, dhash)
+
+    return PreparedImage(data, MIME_TYPES[image_format], choose_detail(width, height), width, height, dhash)
+
+
+# 前処理用のワーカープール
+preprocess_executor = ThreadPoolExecutor(max_workers=IMAGE_PREPROCESS_WORKERS, thread_name_prefix="image-preprocess")
+
+
+async def preprocess_image_async(contents: bytes, content_type: Optional[str] = None) -> PreparedImage:
+    """
+    preprocess_image をワーカープールで実行する
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(preprocess_executor, preprocess_image, contents, content_type)
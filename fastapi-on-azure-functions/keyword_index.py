@@ -0,0 +1,156 @@
+# keyword_index.py
+import asyncio
+import hashlib
+import logging
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from local_resolver import normalize
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 環境変数から埋め込みの設定を取得
+AZURE_OPENAI_EMBEDDING_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")  # 例: text-embedding-3-small
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+# true の場合、埋め込みモデルのデプロイが無くてもハッシュ埋め込みを使用する（テスト・オフラインでの動作確認用）
+# 文字の一致しか見ないため、本番環境では使用しないこと
+KEYWORD_HASHING_EMBEDDINGS = os.getenv("KEYWORD_HASHING_EMBEDDINGS", "false").lower() == "true"
+HASHING_EMBEDDING_DIMENSIONS = 512
+
+
+class HashingEmbeddingProvider:
+    """
+    文字 n-gram をハッシュして固定長のベクトルにする埋め込み（外部サービス不要・決定的）
+    意味の近さは扱えないため、テストやオフラインでの動作確認にのみ使用する（KEYWORD_HASHING_EMBEDDINGS=true）
+    """
+
+    def __init__(self, dimensions: int = HASHING_EMBEDDING_DIMENSIONS, ngram_sizes: Sequence[int] = (1, 2, 3)):
+        self.dimensions = dimensions
+        self.ngram_sizes = ngram_sizes
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        text = normalize(text)
+        for n in self.ngram_sizes:
+            for i in range(len(text) - n + 1):
+                digest = hashlib.blake2b(text[i:i + n].encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                # 長い n-gram ほど重みを大きくする
+                vector[value % self.dimensions] += n if value & (1 << 63) else -n
+        return vector
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        return np.stack([self._embed_one(text) for text in texts]) if texts else np.zeros((0, self.dimensions), dtype=np.float32)
+
+
+class AzureOpenAIEmbeddingProvider:
+    """
+    Azure OpenAI の埋め込みモデルを使用する埋め込み
+    """
+
+    def __init__(self, client, deployment: str, limiter=None, batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.client = client
+        self.deployment = deployment
+        self.limiter = limiter
+        self.batch_size = batch_size
+
+    async def _create(self, **kwargs):
+        if self.limiter is None:
+            return await self.client.embeddings.create(**kwargs)
+        return await self.limiter.call(self.client.embeddings.create, **kwargs)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = await self._create(
+                model=self.deployment,
+                input=texts[start:start + self.batch_size],
+            )
+            vectors.extend(data.embedding for data in sorted(response.data, key=lambda data: data.index))
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def create_embedding_provider(client, limiter=None):
+    """
+    埋め込みモデルのデプロイが設定されていれば Azure OpenAI を、KEYWORD_HASHING_EMBEDDINGS=true であればハッシュ埋め込みを使用する
+    :param client: AsyncAzureOpenAI のクライアント
+    :param limiter: 同時実行数の制限と再試行を行う OpenAICallLimiter
+    :return: 埋め込みのプロバイダ（どちらも無い場合は None。キーワードの選択はキーワード一覧全体を GPT に渡す）
+    """
+    if AZURE_OPENAI_EMBEDDING_DEPLOYMENT:
+        return AzureOpenAIEmbeddingProvider(client, AZURE_OPENAI_EMBEDDING_DEPLOYMENT, limiter)
+    if KEYWORD_HASHING_EMBEDDINGS:
+        logger.warning("Using hashing embeddings for keyword matching (KEYWORD_HASHING_EMBEDDINGS=true)")
+        return HashingEmbeddingProvider()
+    logger.info("AZURE_OPENAI_EMBEDDING_DEPLOYMENT is not set; keywords are selected by GPT from the full list")
+    return None
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class KeywordVectorIndex:
+    """
+    キーワードの埋め込みを保持し、コサイン類似度で上位 k 件を検索するインデックス
+    キーワード一覧が変わった場合は、新しいキーワードのみを埋め込んで再構築する
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+        self._vectors = {}  # keyword -> 正規化済みのベクトル
+        self._source: Optional[List[str]] = None
+        self._keywords: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure(self, keywords: List[str]):
+        """
+        インデックスを指定されたキーワード一覧に合わせる
+        :param keywords: キーワードのスナップショット（変わらない間は同じリストが渡される）
+        """
+        if keywords is self._source or keywords == self._keywords:
+            self._source = keywords
+            return
+
+        async with self._lock:
+            if keywords is self._source:
+                return
+            missing = [keyword for keyword in dict.fromkeys(keywords) if keyword not in self._vectors]
+            if missing:
+                vectors = _normalize_rows(await self.provider.embed(missing))
+                self._vectors.update(zip(missing, vectors))
+                logger.info(f"Embedded {len(missing)} keywords")
+
+            # 削除されたキーワードのベクトルは破棄する
+            current = set(keywords)
+            for keyword in [keyword for keyword in self._vectors if keyword not in current]:
+                del self._vectors[keyword]
+
+            self._keywords = list(dict.fromkeys(keywords))
+            self._matrix = np.stack([self._vectors[keyword] for keyword in self._keywords]) if self._keywords else None
+            self._source = keywords
+
+    async def search(self, text: str, keywords: List[str], k: int) -> List[Tuple[str, float]]:
+        """
+        入力に近いキーワードを類似度の高い順に最大 k 件返す
+        :param text: ユーザーのフリーワード
+        :param keywords: 検索対象のキーワード一覧
+        :param k: 取得する件数
+        :return: (キーワード, コサイン類似度) のリスト
+        """
+        await self._ensure(keywords)
+        if self._matrix is None:
+            return []
+
+        query = _normalize_rows(await self.provider.embed([text]))[0]
+        scores = self._matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._keywords[i], float(scores[i])) for i in top]
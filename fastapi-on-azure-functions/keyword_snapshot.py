@@ -0,0 +1,184 @@
+# keyword_snapshot.py
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from table_storage import scan_keywords
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 環境変数からスナップショットの更新間隔（秒）を取得
+KEYWORD_SNAPSHOT_TTL_SECONDS = float(os.getenv("KEYWORD_SNAPSHOT_TTL_SECONDS", "300"))
+
+# 分類（itemType）を指定せずに登録されたラベルの PartitionKey
+UNKNOWN_ITEM_TYPE = "Unknown"
+
+
+class KeywordSnapshot:
+    """
+    Azure Table Storage に登録されているキーワード（ラベル）の一覧と、その分類（itemType）をメモリ上に保持するスナップショット
+    TTL が切れるとバックグラウンドで再取得し、読み取り側はテーブルの走査を待たずに現在の一覧を受け取る。
+    /labels の追加・削除はスナップショットに即時反映する。
+    """
+
+    def __init__(self, ttl_seconds: float = KEYWORD_SNAPSHOT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._keywords: Dict[str, frozenset] = {}  # keyword -> 分類の集合
+        self._sorted: List[str] = []
+        self._by_item_type: Dict[str, List[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # 再取得中に行われた追加・削除（走査結果に上書きされないよう、完了後に再適用する）
+        self._pending = []
+        # キーワード一覧が変わるたびに増える番号（キャッシュのキーに使用できる）
+        self.version = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    async def _ensure_loaded(self):
+        """
+        初回の読み込み前のみ走査の完了を待ち、それ以降は期限切れでも待たずに裏で再取得する
+        """
+        if self._loaded_at is None:
+            # 呼び出し側がキャンセルされても走査自体は継続させる
+            await asyncio.shield(self.schedule_refresh())
+        elif self.is_stale:
+            self.schedule_refresh()
+
+    async def get(self) -> List[str]:
+        """
+        キーワードの一覧を返す
+        """
+        await self._ensure_loaded()
+        return self._sorted
+
+    async def get_for_item_type(self, item_type: str) -> List[str]:
+        """
+        指定した分類のキーワードと、分類なしで登録されたキーワードを返す
+        :param item_type: 分類（例: 財布）
+        """
+        typed, untyped = await self.get_groups_for_item_type(item_type)
+        return typed + untyped
+
+    async def get_groups_for_item_type(self, item_type: str) -> Tuple[List[str], List[str]]:
+        """
+        指定した分類のキーワードと、分類なしで登録されたキーワード（前者に含まれないもの）を分けて返す
+        :param item_type: 分類（例: 財布）
+        """
+        await self._ensure_loaded()
+        typed = self._by_item_type.get(item_type, [])
+        untyped = [keyword for keyword in self._by_item_type.get(UNKNOWN_ITEM_TYPE, []) if keyword not in typed]
+        return typed, untyped
+
+    def schedule_refresh(self) -> asyncio.Task:
+        """
+        バックグラウンドでの再取得を開始する（実行中の場合は同じタスクを返す）
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._pending = []
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    async def _refresh(self):
+        try:
+            scanned = await scan_keywords()
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.error(f"Failed to refresh keyword snapshot: {e}")
+            return
+
+        keywords = {keyword: frozenset(item_types) for keyword, item_types in scanned.items()}
+        for operation, keyword, item_type in self._pending:
+            if operation == "add":
+                keywords[keyword] = keywords.get(keyword, frozenset()) | {item_type}
+            elif operation == "clear":
+                keywords = {}
+            else:
+                keywords.pop(keyword, None)
+        self._pending = []
+        self._set(keywords)
+        self._loaded_at = time.monotonic()
+        self.refreshes += 1
+        logger.info(f"Keyword snapshot refreshed: {len(keywords)} keywords (version {self.version})")
+
+    def _set(self, keywords: Dict[str, frozenset]):
+        if keywords == self._keywords:
+            return
+        self._keywords = keywords
+        self._sorted = sorted(keywords)
+        by_item_type = {}
+        for keyword in self._sorted:
+            for item_type in keywords[keyword]:
+                by_item_type.setdefault(item_type, []).append(keyword)
+        self._by_item_type = by_item_type
+        self.version += 1
+
+    def _refreshing(self) -> bool:
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    def add(self, keyword: str, item_type: Optional[str] = None):
+        """
+        追加されたキーワードを即時反映する
+        :param keyword: キーワード
+        :param item_type: 分類（PartitionKey と同じく、未指定の場合は Unknown）
+        """
+        if not keyword:
+            return
+        item_type = item_type or UNKNOWN_ITEM_TYPE
+        if self._refreshing():
+            self._pending.append(("add", keyword, item_type))
+        self._set({**self._keywords, keyword: self._keywords.get(keyword, frozenset()) | {item_type}})
+
+    def add_many(self, labels):
+        """
+        一括登録されたキーワードをまとめて即時反映する（一覧の作り直しは1回だけ行う）
+        :param labels: (キーワード, 分類) の組の一覧
+        """
+        keywords = dict(self._keywords)
+        for keyword, item_type in labels:
+            if not keyword:
+                continue
+            item_type = item_type or UNKNOWN_ITEM_TYPE
+            if self._refreshing():
+                self._pending.append(("add", keyword, item_type))
+            keywords[keyword] = keywords.get(keyword, frozenset()) | {item_type}
+        self._set(keywords)
+
+    def remove(self, keyword: str):
+        """
+        削除されたキーワードを即時反映する
+        """
+        if self._refreshing():
+            self._pending.append(("remove", keyword, None))
+        self._set({key: value for key, value in self._keywords.items() if key != keyword})
+
+    def clear(self):
+        """
+        すべてのキーワードが削除されたことを即時反映する
+        """
+        if self._refreshing():
+            self._pending.append(("clear", None, None))
+        self._set({})
+
+    def stats(self) -> dict:
+        """スナップショットの状態を返す"""
+        return {
+            "keywords": len(self._keywords),
+            "itemTypes": len(self._by_item_type),
+            "version": self.version,
+            "ageSeconds": None if self._loaded_at is None else time.monotonic() - self._loaded_at,
+            "ttlSeconds": self.ttl_seconds,
+            "refreshes": self.refreshes,
+            "refreshFailures": self.refresh_failures,
+        }
+
+
+keyword_snapshot = KeywordSnapshot()
@@ -0,0 +1,250 @@
+# label_import.py
+import codecs
+import csv
+import io
+import json
+import logging
+import os
+from typing import AsyncIterator, Optional, Tuple
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 環境変数から一括登録の設定を取得
+# 1回の一括登録で受け付ける最大行数
+LABELS_BULK_MAX_ROWS = int(os.getenv("LABELS_BULK_MAX_ROWS", "10000"))
+# キーワード・分類の最大文字数
+LABEL_MAX_LENGTH = int(os.getenv("LABEL_MAX_LENGTH", "256"))
+
+# RowKey・PartitionKey に使用できない文字（分類は PartitionKey になる）
+INVALID_KEY_CHARACTERS = set("/\\#?")
+
+
+async def _decode(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    受信したバイト列を UTF-8 の文字列として順に返す（チャンクの境界で分割された文字も正しく扱う）
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def _element_end(buffer: str, start: int, finished: bool) -> Optional[int]:
+    """
+    JSON 配列の要素が終わる位置を返す（要素がバッファ内で完結していない場合は None）
+    括弧の対応が取れない場合は、残りを受信せずにその時点でエラーにする
+    :param buffer: 受信済みの文字列
+    :param start: 要素の先頭の位置
+    :param finished: これ以上受信するデータが無い場合は True
+    :raises ValueError: 括弧の対応が不正な場合
+    """
+    first = buffer[start]
+    if first not in "{[\"":
+        # 数値・true・false・null は区切り文字まで
+        position = start
+        while position < len(buffer) and buffer[position] not in ",]" and not buffer[position].isspace():
+            position += 1
+        return position if position < len(buffer) or finished else None
+
+    closers = []
+    in_string = False
+    escaped = False
+    for position in range(start, len(buffer)):
+        character = buffer[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif character == "\\":
+                escaped = True
+            elif character == '"':
+                in_string = False
+                if not closers:
+                    return position + 1
+        elif character == '"':
+            in_string = True
+        elif character in "{[":
+            closers.append("}" if character == "{" else "]")
+        elif character in "}]":
+            if not closers or closers.pop() != character:
+                raise ValueError("括弧の対応が不正です")
+            if not closers:
+                return position + 1
+    return None
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    """
+    JSON 配列を受信しながら、要素を1つずつ返す（配列全体をメモリに読み込まない）
+    要素が完結した時点で解析し、不正な要素・区切り（カンマの不足・重複）があればそれ以降を受信せずにエラーにする
+    閉じ括弧の後に空白以外のデータがある場合もエラーにする
+    :param chunks: リクエストボディのチャンク
+    :raises ValueError: JSON 配列として解析できない場合
+    """
+    buffer = ""
+    position = 0
+    offset = 0  # 破棄済みの文字数（エラー位置の表示用）
+    # 次に受け付けるもの: "[" / 要素または "]" / 要素（カンマの後）/ カンマまたは "]" / 空白のみ（閉じ括弧の後）
+    expecting = "open"
+    finished = False
+    texts = _decode(chunks)
+
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+
+        if position < len(buffer):
+            character = buffer[position]
+            location = offset + position + 1
+            if expecting == "open":
+                if character != "[":
+                    raise ValueError("JSON 配列ではありません")
+                expecting = "first"
+                position += 1
+                continue
+            if expecting == "end":
+                raise ValueError(f"JSON 配列の後に余分なデータがあります（{location} 文字目）")
+            if expecting == "separator":
+                if character == ",":
+                    expecting = "element"
+                elif character == "]":
+                    expecting = "end"
+                else:
+                    raise ValueError(f"JSON の解析に失敗しました（{location} 文字目にカンマがありません）")
+                position += 1
+                continue
+            if character == "]" and expecting == "first":
+                expecting = "end"
+                position += 1
+                continue
+            if character in ",]":
+                raise ValueError(f"JSON の解析に失敗しました（{location} 文字目に要素がありません）")
+            try:
+                end = _element_end(buffer, position, finished)
+            except ValueError as e:
+                raise ValueError(f"JSON の解析に失敗しました（{location} 文字目付近の要素）") from e
+            if end is not None:
+                try:
+                    value = json.loads(buffer[position:end])
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"JSON の解析に失敗しました（{offset + position + e.pos + 1} 文字目付近）") from e
+                yield value
+                position = end
+                expecting = "separator"
+                continue
+        if finished:
+            if expecting == "end":
+                return
+            raise ValueError("JSON 配列が閉じられていません")
+
+        try:
+            text = await texts.__anext__()
+            offset += position
+            buffer = buffer[position:] + text
+            position = 0
+        except StopAsyncIteration:
+            finished = True
+
+
+def _record_boundary(buffer: str, start: int, in_quotes: bool) -> Tuple[int, bool]:
+    """
+    引用符の外にある最後の改行の直後の位置を返す（引用符で囲まれた値の中の改行では区切らない）
+    :param buffer: 受信済みの文字列
+    :param start: 前回までに走査した位置
+    :param in_quotes: start の時点で引用符の中かどうか
+    :return: (区切りの位置（無い場合は 0）, 末尾の時点で引用符の中かどうか)
+    """
+    boundary = 0
+    for position in range(start, len(buffer)):
+        character = buffer[position]
+        if character == '"':
+            # "" によるエスケープは2回反転するため、状態は変わらない
+            in_quotes = not in_quotes
+        elif character == "\n" and not in_quotes:
+            boundary = position + 1
+    return boundary, in_quotes
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """
+    CSV を受信しながら、1行ずつヘッダーの列名をキーとした辞書で返す（1行目はヘッダー）
+    引用符で囲まれた値の中の改行・カンマは、チャンクの区切りに関係なく値の一部として扱う
+    :param chunks: リクエストボディのチャンク
+    """
+    header = None
+    buffer = ""
+    scanned = 0
+    in_quotes = False
+
+    def parse(lines: str):
+        nonlocal header
+        for values in csv.reader(io.StringIO(lines, newline="")):
+            if not values:
+                continue
+            if header is None:
+                header = [value.strip() for value in values]
+                continue
+            yield dict(zip(header, values))
+
+    async for text in _decode(chunks):
+        buffer += text
+        # 引用符の外の改行までの完全なレコードのみを解析し、残りは次のチャンクと結合する
+        end, in_quotes = _record_boundary(buffer, scanned, in_quotes)
+        if end:
+            for row in parse(buffer[:end]):
+                yield row
+            buffer = buffer[end:]
+        # 走査済みの位置と、その時点の引用符の状態を次のチャンクに引き継ぐ
+        scanned = len(buffer)
+
+    for row in parse(buffer):
+        yield row
+
+
+def validate_label_row(row: object) -> dict:
+    """
+    一括登録の1行を検証し、登録するラベルのデータ（keyword, itemType）を返す
+    :param row: JSON の要素または CSV の1行
+    :raises ValueError: 登録できない行の場合（メッセージは行ごとの結果として返す）
+    """
+    if not isinstance(row, dict):
+        raise ValueError("行がオブジェクトではありません")
+
+    keyword = row.get("keyword")
+    item_type = row.get("itemType")
+    if not isinstance(keyword, str) or not keyword.strip():
+        raise ValueError("keyword が指定されていません")
+    if item_type is not None and not isinstance(item_type, str):
+        raise ValueError("itemType は文字列で指定してください")
+
+    keyword = keyword.strip()
+    item_type = (item_type or "").strip() or None
+    for name, value in (("keyword", keyword), ("itemType", item_type)):
+        if value is None:
+            continue
+        if len(value) > LABEL_MAX_LENGTH:
+            raise ValueError(f"{name} は {LABEL_MAX_LENGTH} 文字以内で指定してください")
+    if item_type and (INVALID_KEY_CHARACTERS & set(item_type) or any(ord(c) < 0x20 for c in item_type)):
+        raise ValueError("itemType に使用できない文字が含まれています")
+
+    data = {"keyword": keyword}
+    if item_type:
+        data["itemType"] = item_type
+    return data
+
+
+async def iter_label_rows(chunks: AsyncIterator[bytes], content_type: Optional[str]) -> AsyncIterator[object]:
+    """
+    Content-Type に応じて、JSON 配列または CSV の行を順に返す
+    """
+    if content_type and "csv" in content_type.lower():
+        rows = iter_csv_rows(chunks)
+    else:
+        rows = iter_json_array(chunks)
+    async for row in rows:
+        yield row
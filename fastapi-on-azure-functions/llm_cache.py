@@ -0,0 +1,196 @@
+# llm_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from local_resolver import normalize
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 環境変数からキャッシュの設定を取得
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+# 指定した場合、解決結果を JSON ファイルにも保存し、コールドスタート後も再利用する（例: /tmp/llm_cache.json）
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+# 変更を永続化ファイルに書き出すまでの待ち時間（秒）。この間の変更はまとめて1回で書き出す
+LLM_CACHE_SAVE_DELAY_SECONDS = float(os.getenv("LLM_CACHE_SAVE_DELAY_SECONDS", "5"))
+
+# キャッシュの種類
+KEYWORD = "keyword"
+CATEGORY = "category"
+LOCATION = "location"
+
+
+def fingerprint(candidates: Iterable[str]) -> str:
+    """
+    候補リスト（またはプロンプト）の内容からフィンガープリントを作成する（順序には依存しない）
+    :param candidates: キーワード一覧など
+    """
+    digest = hashlib.sha1("\n".join(sorted(candidates)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class ResolutionCache:
+    """
+    GPT による解決結果（フリーワード → キーワード、分類、場所）を保持するキャッシュ（TTL + LRU）
+    キーは種類・候補リストのフィンガープリント・正規化済みの入力。候補リストが変わるとキーも変わるため、
+    古い候補リストに対する結果が返ることはない。
+    永続化ファイルへの書き出しは save_delay 秒ごとにまとめ、イベントループを止めないよう別スレッドで行う
+    （プロセスが終了すると、書き出し前の変更は失われる）。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        path: Optional[str] = LLM_CACHE_PATH,
+        save_delay: float = LLM_CACHE_SAVE_DELAY_SECONDS
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self.save_delay = save_delay
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._dirty = False
+        self._save_task: Optional[asyncio.Task] = None
+        self.saves = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._load()
+
+    @staticmethod
+    def make_key(kind: str, candidates_fingerprint: str, text: str) -> str:
+        return f"{kind}:{candidates_fingerprint}:{normalize(text or '')}"
+
+    def get(self, kind: str, candidates_fingerprint: str, text: str) -> Optional[str]:
+        """
+        キャッシュされた解決結果を返す（無い場合、期限切れの場合は None）
+        """
+        key = self.make_key(kind, candidates_fingerprint, text)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, kind: str, candidates_fingerprint: str, text: str, value: str):
+        """
+        解決結果をキャッシュに登録する
+        :param kind: KEYWORD / CATEGORY / LOCATION
+        :param candidates_fingerprint: fingerprint で作成した候補リストのフィンガープリント
+        :param text: ユーザーの入力
+        :param value: GPT の応答
+        """
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+
+        key = self.make_key(kind, candidates_fingerprint, text)
+        self._entries[key] = (time.time() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._schedule_save()
+
+    def invalidate(self, kind: Optional[str] = None):
+        """
+        指定した種類（省略時はすべて）のエントリを破棄する
+        ラベル（キーワード）の追加・削除時に呼び出す
+        """
+        stale_keys = [key for key in self._entries if kind is None or key.startswith(f"{kind}:")]
+        for key in stale_keys:
+            del self._entries[key]
+        self.invalidations += len(stale_keys)
+        if stale_keys:
+            logger.info(f"Invalidated {len(stale_keys)} cached {kind or 'LLM'} resolutions")
+            self._schedule_save()
+
+    def _load(self):
+        """永続化ファイルから有効期限内のエントリを読み込む"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+            now = time.time()
+            for key, (expires_at, value) in stored.items():
+                if expires_at >= now:
+                    self._entries[key] = (expires_at, value)
+            logger.info(f"Loaded {len(self._entries)} cached LLM resolutions from {self.path}")
+        except Exception as e:
+            logger.warning(f"Failed to load LLM cache from {self.path}: {e}")
+
+    def _schedule_save(self):
+        """
+        永続化ファイルへの書き出しを予約する（予約済みの場合は、その書き出しに含める）
+        イベントループの外から呼び出された場合は、その場で書き出す
+        """
+        if not self.path:
+            return
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._save()
+            return
+        # 別のループ（終了済みのループなど）で予約したタスクは待たずに、このループで予約し直す
+        if self._save_task is None or self._save_task.done() or self._save_task.get_loop() is not loop:
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(self.save_delay)
+        while self._dirty:
+            self._dirty = False
+            # エントリの複製はループ上で作成し、JSON 化とファイルの書き込みのみ別スレッドで行う
+            await asyncio.to_thread(self._write, dict(self._entries))
+
+    def _save(self):
+        """永続化ファイルにすぐに書き出す"""
+        if not self.path:
+            return
+        self._dirty = False
+        self._write(dict(self._entries))
+
+    def _write(self, entries: dict):
+        """永続化ファイルに書き出す（一時ファイルに書いてから置き換える）"""
+        try:
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(temporary_path, self.path)
+            self.saves += 1
+        except Exception as e:
+            logger.warning(f"Failed to save LLM cache to {self.path}: {e}")
+
+    def stats(self) -> dict:
+        """ヒット率などの統計情報を返す"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl_seconds,
+            "persistent": bool(self.path),
+            "saves": self.saves,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+resolution_cache = ResolutionCache()
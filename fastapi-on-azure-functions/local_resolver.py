@@ -0,0 +1,141 @@
+# local_resolver.py
+import difflib
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+# 中分類の選択肢と別名（読み・略称・言い換え）
+CATEGORY_SYNONYMS: Dict[str, List[str]] = {
+    "手提げかばん": ["手提げ", "手提げ鞄", "かばん", "鞄", "バッグ", "ハンドバッグ", "トートバッグ", "リュック", "リュックサック", "ショルダーバッグ", "bag"],
+    "財布": ["さいふ", "ウォレット", "長財布", "二つ折り財布", "小銭入れ", "札入れ", "がま口", "wallet"],
+    "傘": ["かさ", "アンブレラ", "日傘", "雨傘", "折りたたみ傘", "折り畳み傘", "ビニール傘", "umbrella"],
+    "時計": ["とけい", "ウォッチ", "腕時計", "スマートウォッチ", "watch"],
+    "メガネ": ["めがね", "眼鏡", "グラサン", "サングラス", "老眼鏡", "glasses"],
+    "携帯電話": ["携帯", "ケータイ", "スマホ", "スマートフォン", "ガラケー", "iphone", "android", "phone", "smartphone"],
+    "カメラ": ["デジカメ", "デジタルカメラ", "一眼レフ", "ミラーレス", "camera"],
+    "鍵": ["かぎ", "カギ", "キー", "合鍵", "キーケース", "key"],
+    "本": ["ほん", "書籍", "教科書", "参考書", "文庫", "文庫本", "雑誌", "漫画", "マンガ", "ノート", "book"],
+    "アクセサリー": ["アクセ", "ネックレス", "指輪", "リング", "ピアス", "イヤリング", "ブレスレット", "accessory"],
+    "携帯音響品": ["イヤホン", "イヤフォン", "ワイヤレスイヤホン", "ヘッドホン", "ヘッドフォン", "airpods", "ウォークマン", "音楽プレーヤー", "ポータブルプレーヤー"],
+}
+
+# 場所の選択肢と別名（市名・読み・ローマ字）
+LOCATION_SYNONYMS: Dict[str, List[str]] = {
+    "旭川市": ["旭川", "あさひかわ", "asahikawa"],
+    "函館市": ["函館", "はこだて", "hakodate"],
+    "小樽市": ["小樽", "おたる", "otaru"],
+    "千歳市": ["千歳", "ちとせ", "chitose", "新千歳", "新千歳空港"],
+    "苫小牧市": ["苫小牧", "とまこまい", "tomakomai"],
+    "室蘭市": ["室蘭", "むろらん", "muroran"],
+    "北見市": ["北見", "きたみ", "kitami"],
+    "札幌駅": ["札幌", "さっぽろ", "さっぽろえき", "sapporo", "札幌市"],
+}
+
+# この値以上の一致度であれば GPT を呼ばずにローカルで確定する
+CONFIDENCE_THRESHOLD = 0.8
+
+# 入力が別名を含むだけの場合の一致度（しきい値未満のため GPT で確認する）
+# 例: ノートパソコン は「ノート」を、キーボード は「キー」を含むが、本・鍵ではない
+CONTAINMENT_SCORE = 0.7
+
+
+def normalize(text: str) -> str:
+    """
+    表記ゆれを吸収するための正規化（全角/半角の統一、カタカナ→ひらがな、小文字化、空白除去）
+    :param text: 入力文字列
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = "".join(
+        chr(ord(ch) - 0x60) if "ァ" <= ch <= "ヶ" else ch
+        for ch in text
+        if not ch.isspace()
+    )
+    return text
+
+
+def rank_by_relevance(keywords: List[str], hint: str, synonyms: Dict[str, List[str]] = CATEGORY_SYNONYMS) -> List[str]:
+    """
+    キーワードをヒント（中分類など）との関連度の高い順に並べ替える（関連度が同じ場合は元の順序を保つ）
+    ヒントが選択肢の場合は、その別名との一致も考慮する（例: 財布 → 長財布、小銭入れ）
+    :param keywords: キーワードの候補
+    :param hint: 中分類などのヒント
+    """
+    terms = [normalize(term) for term in [hint, *synonyms.get(hint, [])]]
+    terms = [term for term in terms if term]
+    matcher = difflib.SequenceMatcher()
+
+    def relevance(keyword: str) -> float:
+        text = normalize(keyword)
+        if not text:
+            return 0.0
+        best = 0.0
+        matcher.set_seq2(text)
+        for term in terms:
+            if term in text or text in term:
+                return 1.0
+            matcher.set_seq1(term)
+            best = max(best, matcher.ratio())
+        return best
+
+    return sorted(keywords, key=relevance, reverse=True)
+
+
+def _build_index(synonyms: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+    """正規化済みの (表記, 選択肢) の一覧を作成する"""
+    index = []
+    for choice, aliases in synonyms.items():
+        for alias in [choice, *aliases]:
+            index.append((normalize(alias), choice))
+    return index
+
+
+class LocalChoiceResolver:
+    """
+    固定の選択肢への対応付けを、正規化・別名辞書・あいまい一致でローカルに行うリゾルバ
+    一致度が低い場合は None を返し、呼び出し側で GPT にフォールバックする
+    """
+
+    def __init__(self, synonyms: Dict[str, List[str]], threshold: float = CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+        self._index = _build_index(synonyms)
+        self._exact = {alias: choice for alias, choice in self._index}
+
+    def match(self, message: str) -> Tuple[Optional[str], float]:
+        """
+        最も近い選択肢と一致度（0.0〜1.0）を返す
+        :param message: ユーザーの入力
+        """
+        text = normalize(message or "")
+        if not text:
+            return None, 0.0
+
+        # 完全一致
+        if text in self._exact:
+            return self._exact[text], 1.0
+
+        best_choice, best_score = None, 0.0
+        matcher = difflib.SequenceMatcher(None, "", text)
+        for alias, choice in self._index:
+            # 入力が別名を含む（例: 黒い長財布 → 長財布）。単語の区切りは判定できないため、候補としてのみ扱う
+            if len(alias) >= 2 and alias in text:
+                score = CONTAINMENT_SCORE
+            else:
+                # 上限値で足切りしてから正確な一致度を計算する
+                matcher.set_seq1(alias)
+                if matcher.real_quick_ratio() <= best_score or matcher.quick_ratio() <= best_score:
+                    continue
+                score = matcher.ratio()
+            if score > best_score:
+                best_choice, best_score = choice, score
+        return best_choice, best_score
+
+    def resolve(self, message: str) -> Optional[str]:
+        """
+        一致度がしきい値以上の場合のみ選択肢を返す
+        :param message: ユーザーの入力
+        """
+        choice, score = self.match(message)
+        return choice if score >= self.threshold else None
+
+
+category_resolver = LocalChoiceResolver(CATEGORY_SYNONYMS)
+location_resolver = LocalChoiceResolver(LOCATION_SYNONYMS)
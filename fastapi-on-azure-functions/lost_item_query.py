@@ -0,0 +1,136 @@
+# lost_item_query.py
+import asyncio
+import heapq
+import logging
+from typing import AsyncIterator, List, Optional
+
+from pagination import sort_key
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RequestChargeTracker:
+    """
+    クエリごとの消費 RU を集計する raw_response_hook
+    SDK 内部で発生する HTTP リクエストごとに呼び出され、x-ms-request-charge を加算する
+    """
+
+    def __init__(self):
+        self.request_charge = 0.0
+        self.request_count = 0
+
+    def __call__(self, response):
+        charge = response.http_response.headers.get("x-ms-request-charge")
+        if charge:
+            self.request_charge += float(charge)
+        self.request_count += 1
+
+
+def _describe_scope(partition_key: Optional[str]) -> str:
+    return "cross-partition" if partition_key is None else f"partition '{partition_key}'"
+
+
+async def _query_partition(
+    container,
+    query: str,
+    parameters: List[dict],
+    partition_key: Optional[str],
+    page_size: Optional[int]
+) -> List[dict]:
+    """
+    1つのパーティション（partition_key が None の場合は全パーティション）に対してクエリを実行する
+    page_size を指定した場合は、page_size 件に達するか結果が尽きるまでページを読み込む
+    （フィルタや ARRAY_CONTAINS を含むクエリでは、結果が残っていても max_item_count 未満・0 件のページが返ることがある）
+    """
+    tracker = RequestChargeTracker()
+    query_options = {"raw_response_hook": tracker}
+    if partition_key is not None:
+        query_options["partition_key"] = partition_key
+    if page_size is not None:
+        query_options["max_item_count"] = page_size
+
+    result = container.query_items(query=query, parameters=parameters, **query_options)
+    if page_size is None:
+        items = [item async for item in result]
+    else:
+        items = []
+        async for page in result.by_page():
+            items.extend([item async for item in page])
+            if len(items) >= page_size:
+                break
+        # 次ページは最後のアイテムの並び順の値から再開するため、超過分は切り捨ててよい
+        del items[page_size:]
+
+    logger.info(
+        f"Query on {_describe_scope(partition_key)} returned {len(items)} items "
+        f"({tracker.request_charge:.2f} RU, {tracker.request_count} requests)"
+    )
+    return items
+
+
+async def query_lost_items(
+    container,
+    query: str,
+    parameters: List[dict],
+    partition_keys: Optional[List[str]] = None,
+    page_size: Optional[int] = None
+) -> List[dict]:
+    """
+    パーティションキーが確定している場合はパーティション単位でクエリを実行し、結果をマージして返す関数
+    :param container: LostItems コンテナ
+    :param query: ORDER BY c.findDateTime DESC, c.id DESC を含むクエリ
+    :param parameters: クエリパラメータ
+    :param partition_keys: 対象パーティション（None の場合はパーティションをまたいでクエリする）
+    :param page_size: 1ページの件数（None の場合は全件取得）
+    :return: findDateTime, id の降順に並んだアイテム
+    """
+    if partition_keys is None:
+        return await _query_partition(container, query, parameters, None, page_size)
+
+    if len(partition_keys) == 1:
+        return await _query_partition(container, query, parameters, partition_keys[0], page_size)
+
+    # 複数パーティションは並列にクエリし、各結果（降順）をマージする
+    results = await asyncio.gather(*[
+        _query_partition(container, query, parameters, partition_key, page_size)
+        for partition_key in partition_keys
+    ])
+    merged = heapq.merge(*results, key=sort_key, reverse=True)
+    if page_size is None:
+        return list(merged)
+    return [item for _, item in zip(range(page_size), merged)]
+
+
+async def iter_lost_item_pages(
+    container,
+    query: str,
+    parameters: List[dict],
+    partition_keys: Optional[List[str]] = None,
+    page_size: int = 100
+) -> AsyncIterator[List[dict]]:
+    """
+    クエリ結果をページ単位で返す非同期ジェネレータ（パーティションごとに順番に読み込む）
+    :param container: LostItems コンテナ
+    :param query: クエリ
+    :param parameters: クエリパラメータ
+    :param partition_keys: 対象パーティション（None の場合はパーティションをまたいでクエリする）
+    :param page_size: Cosmos DB から1回で読み込む件数
+    """
+    for partition_key in (partition_keys if partition_keys is not None else [None]):
+        tracker = RequestChargeTracker()
+        query_options = {"raw_response_hook": tracker, "max_item_count": page_size}
+        if partition_key is not None:
+            query_options["partition_key"] = partition_key
+
+        count = 0
+        async for page in container.query_items(query=query, parameters=parameters, **query_options).by_page():
+            items = [item async for item in page]
+            count += len(items)
+            yield items
+
+        logger.info(
+            f"Streaming query on {_describe_scope(partition_key)} returned {count} items "
+            f"({tracker.request_charge:.2f} RU, {tracker.request_count} requests)"
+        )
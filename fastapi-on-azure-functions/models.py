@@ -57,6 +57,10 @@ class LostItem(LostItemRequest):
     class Config:
         extra = Extra.allow
 
+class LostItemPage(BaseModel):
+    items: List[LostItem] = []                      # 現在のページのアイテム
+    continuation: Optional[str] = None              # 次ページ取得用の継続トークン（最終ページの場合は None）
+
 class KeywordUpdateRequest(BaseModel):
     keyword: List[str] = []  # キーワードリスト
 
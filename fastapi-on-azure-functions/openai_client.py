@@ -0,0 +1,184 @@
+# openai_client.py
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+import httpx
+import openai
+from openai import AsyncAzureOpenAI
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 環境変数から設定を取得
+AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
+AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2023-07-01-preview")
+# 共有する HTTP 接続プールの上限
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+# 同時に実行する Azure OpenAI へのリクエスト数の上限（超えた分は待機する）
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+# 429 / 5xx / 接続エラー時の再試行回数
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+OPENAI_BACKOFF_BASE_SECONDS = float(os.getenv("OPENAI_BACKOFF_BASE_SECONDS", "0.5"))
+OPENAI_BACKOFF_MAX_SECONDS = float(os.getenv("OPENAI_BACKOFF_MAX_SECONDS", "20"))
+# 1回の呼び出し（待機・再試行を含む）の期限（秒）
+OPENAI_CALL_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CALL_TIMEOUT_SECONDS", "60"))
+
+# 再試行するエラー
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+)
+
+
+class OpenAICallDeadlineExceeded(TimeoutError):
+    """待機・再試行を含めて呼び出しの期限を超えた場合の例外"""
+
+
+def create_async_client() -> AsyncAzureOpenAI:
+    """
+    接続プールを共有する AsyncAzureOpenAI クライアントを作成する
+    再試行は OpenAICallLimiter で行うため、SDK 側の再試行は無効にする
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(OPENAI_CALL_TIMEOUT_SECONDS, connect=10.0),
+    )
+    return AsyncAzureOpenAI(
+        api_version=AZURE_OPENAI_API_VERSION,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        http_client=http_client,
+        max_retries=0,
+    )
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    エラーレスポンスの Retry-After（retry-after-ms / retry-after）から待機時間を取得する
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            # HTTP 日付形式
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+            if retry_at is not None:
+                return max(0.0, retry_at.timestamp() - time.time())
+    return None
+
+
+class OpenAICallLimiter:
+    """
+    Azure OpenAI への呼び出しを、同時実行数の制限・再試行（Retry-After を優先し、無ければ
+    ジッター付き指数バックオフ）・呼び出しごとの期限付きで実行する
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = OPENAI_MAX_CONCURRENCY,
+        max_retries: int = OPENAI_MAX_RETRIES,
+        backoff_base: float = OPENAI_BACKOFF_BASE_SECONDS,
+        backoff_max: float = OPENAI_BACKOFF_MAX_SECONDS,
+        timeout: float = OPENAI_CALL_TIMEOUT_SECONDS
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.deadline_exceeded = 0
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # 同時に待機した呼び出しが一斉に再送しないよう、少しだけずらす
+            return retry_after + random.uniform(0, self.backoff_base)
+        # フルジッター
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def call(self, function, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        非同期関数（例: client.chat.completions.create）を制限付きで呼び出す
+        :param function: 呼び出す非同期関数
+        :param timeout: 待機・再試行を含めた期限（秒）。省略時は OPENAI_CALL_TIMEOUT_SECONDS
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self.calls += 1
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                response = await asyncio.wait_for(self._call_once(function, args, kwargs, deadline), remaining)
+                return response
+            except asyncio.TimeoutError:
+                self.deadline_exceeded += 1
+                raise OpenAICallDeadlineExceeded(f"Azure OpenAI call did not finish within {timeout or self.timeout} seconds")
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.RateLimitError):
+                    self.throttled += 1
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    # 期限までに再試行できないため、そのままエラーを返す
+                    self.deadline_exceeded += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"Azure OpenAI call failed ({type(e).__name__}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _call_once(self, function, args, kwargs, deadline: float):
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            # HTTP リクエスト自体のタイムアウトも残り時間に合わせる
+            return await function(*args, timeout=max(0.1, deadline - time.monotonic()), **kwargs)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        """同時実行数や再試行回数などの統計情報を返す"""
+        return {
+            "maxConcurrency": self.max_concurrency,
+            "inFlight": self.in_flight,
+            "queued": self.queued,
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "deadlineExceeded": self.deadline_exceeded,
+        }
@@ -0,0 +1,115 @@
+# pagination.py
+import base64
+import json
+from typing import List, Optional, Tuple
+
+# 1ページあたりの件数
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# 並び順に使用するフィールド（findDateTime の降順）
+SORT_FIELD = "findDateTime"
+
+
+class InvalidContinuationToken(ValueError):
+    """継続トークンの形式が不正な場合に送出される例外"""
+
+
+def sort_key(item: dict) -> tuple:
+    """
+    並び順（findDateTime, id の降順）を Python で再現するキー
+    Cosmos DB の ORDER BY（降順）では、文字列の日時 → null → 未設定 の順に並ぶ
+    """
+    value = item.get(SORT_FIELD)
+    if isinstance(value, str):
+        tier = 2
+    elif SORT_FIELD in item:
+        tier = 1
+    else:
+        tier = 0
+    return (tier, value if tier == 2 else "", item.get("id") or "")
+
+
+def order_by_clause() -> str:
+    """
+    継続トークンで同じ位置から再開できるよう、日時が同じ場合も id で並び順を固定する ORDER BY 句
+    （LostItems・LostItemsBySubcategory に findDateTime DESC, id DESC の複合インデックスが必要）
+    """
+    return f" ORDER BY c.{SORT_FIELD} DESC, c.id DESC"
+
+
+def encode_continuation(items: List[dict]) -> Optional[str]:
+    """
+    ページの最後の要素から次ページ取得用の継続トークンを作成する関数
+
+    Python SDK はパーティションをまたぐ ORDER BY クエリの継続トークンを返さないため、
+    最後に返した要素の (findDateTime, id) をトークンに保持する（複合キーによるキーセット方式）。
+    findDateTime が未設定の場合は、null と区別するため "t" を省略する。
+    :param items: 現在のページのアイテム（findDateTime, id の降順）
+    :return: 継続トークン（アイテムがない場合は None）
+    """
+    if not items:
+        return None
+
+    last_item = items[-1]
+    payload = {"id": last_item["id"]}
+    if SORT_FIELD in last_item:
+        last_value = last_item[SORT_FIELD]
+        payload["t"] = last_value if isinstance(last_value, str) else None
+    payload = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_continuation(token: str) -> dict:
+    """
+    継続トークンを復号する関数
+    :param token: encode_continuation で作成したトークン
+    :return: 最後に返した要素の id と findDateTime（未設定の場合は findDateTime を含まない。sort_key に渡せる）
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+        last_id = payload["id"]
+    except Exception as e:
+        raise InvalidContinuationToken(f"Invalid continuation token: {e}") from e
+
+    if not isinstance(payload, dict) or not isinstance(last_id, str):
+        raise InvalidContinuationToken("Invalid continuation token")
+    last_item = {"id": last_id}
+    if "t" in payload:
+        last_value = payload["t"]
+        if last_value is not None and not isinstance(last_value, str):
+            raise InvalidContinuationToken("Invalid continuation token")
+        last_item[SORT_FIELD] = last_value
+    return last_item
+
+
+def continuation_filter(token: str) -> Tuple[str, List[dict]]:
+    """
+    継続トークンから次ページ取得用の WHERE 句とパラメータを作成する関数
+    (findDateTime, id) が最後に返した要素より後ろ（降順）の要素のみを対象にする
+    :param token: 継続トークン
+    :return: (フィルタ式, クエリパラメータ)
+    """
+    last_item = decode_continuation(token)
+    last_id = last_item["id"]
+    if SORT_FIELD not in last_item:
+        # 未設定の日時は最後に並ぶため、その中で id が小さいもののみ
+        clause = f"(NOT IS_DEFINED(c.{SORT_FIELD}) AND c.id < @lastId)"
+        return clause, [{"name": "@lastId", "value": last_id}]
+
+    last_value = last_item[SORT_FIELD]
+    if last_value is None:
+        # null の中で id が小さいものと、その後ろに並ぶ未設定のもの
+        clause = f"((IS_NULL(c.{SORT_FIELD}) AND c.id < @lastId) OR NOT IS_DEFINED(c.{SORT_FIELD}))"
+        return clause, [{"name": "@lastId", "value": last_id}]
+
+    clause = (
+        f"(c.{SORT_FIELD} < @lastSortValue OR "
+        f"(c.{SORT_FIELD} = @lastSortValue AND c.id < @lastId) OR "
+        f"NOT IS_STRING(c.{SORT_FIELD}))"
+    )
+    parameters = [
+        {"name": "@lastSortValue", "value": last_value},
+        {"name": "@lastId", "value": last_id},
+    ]
+    return clause, parameters
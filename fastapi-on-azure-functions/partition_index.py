@@ -0,0 +1,129 @@
+# partition_index.py
+import logging
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+from database import DELETED_FIELD, NOT_DELETED_FILTER, delete_items, get_lost_item_container, get_lost_item_partition_index_container
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# LostItems のパーティションキーとなるフィールド
+PARTITION_KEY_FIELD = "createUserPlace"
+
+# プロセス内にキャッシュする id → パーティションキーの最大件数
+PARTITION_INDEX_CACHE_SIZE = 10000
+
+
+class PartitionKeyIndex:
+    """
+    忘れ物データの id → パーティションキー（createUserPlace）の対応表
+    プロセス内の LRU キャッシュと、LostItemPartitionIndex コンテナ（/id でパーティション分割）の2段で保持する。
+    どちらにも無い場合のみ LostItems をパーティションをまたいでクエリし、結果を対応表に登録する。
+    """
+
+    def __init__(self, max_size: int = PARTITION_INDEX_CACHE_SIZE):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+
+    def _remember(self, id: str, partition_key: str):
+        self._cache[id] = partition_key
+        self._cache.move_to_end(id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def put(self, id: str, partition_key: str):
+        """
+        対応表に登録する（create_lost_item から呼び出す）
+        :param id: 忘れ物データのID
+        :param partition_key: createUserPlace の値
+        """
+        index_container = await get_lost_item_partition_index_container()
+        await index_container.upsert_item(body={"id": id, PARTITION_KEY_FIELD: partition_key})
+        self._remember(id, partition_key)
+
+    async def remove(self, id: str):
+        """
+        対応表から削除する
+        :param id: 忘れ物データのID
+        """
+        self._cache.pop(id, None)
+        index_container = await get_lost_item_partition_index_container()
+        try:
+            await index_container.delete_item(item=id, partition_key=id)
+        except CosmosResourceNotFoundError:
+            pass
+
+    async def remove_many(self, ids: Iterable[str]):
+        """
+        対応表からまとめて削除する（delete_all_lost_items で、アイテムの削除後に呼び出す）
+        :param ids: 忘れ物データのIDの一覧
+        """
+        ids = list(ids)
+        for id in ids:
+            self._cache.pop(id, None)
+        index_container = await get_lost_item_partition_index_container()
+        await delete_items(index_container, ids)
+
+    def clear(self):
+        """プロセス内のキャッシュを破棄する"""
+        self._cache.clear()
+
+    async def get(self, id: str) -> Optional[str]:
+        """
+        パーティションキーを返す（対応表に無い場合は None）
+        :param id: 忘れ物データのID
+        """
+        if id in self._cache:
+            self._cache.move_to_end(id)
+            return self._cache[id]
+
+        index_container = await get_lost_item_partition_index_container()
+        try:
+            entry = await index_container.read_item(item=id, partition_key=id)
+        except CosmosResourceNotFoundError:
+            return None
+
+        partition_key = entry.get(PARTITION_KEY_FIELD)
+        if partition_key is not None:
+            self._remember(id, partition_key)
+        return partition_key
+
+    async def read_lost_item(self, id: str) -> Optional[dict]:
+        """
+        id で忘れ物データを取得する
+        対応表にパーティションキーがあればポイント読み取り（1 RU）、無ければパーティションをまたいだクエリを行う。
+        :param id: 忘れ物データのID
+        :return: 忘れ物データ（見つからない場合、論理削除されている場合は None）
+        """
+        lost_items_container = await get_lost_item_container()
+
+        partition_key = await self.get(id)
+        if partition_key is not None:
+            try:
+                item = await lost_items_container.read_item(item=id, partition_key=partition_key)
+                return None if item.get(DELETED_FIELD) else item
+            except CosmosResourceNotFoundError:
+                # 対応表が古い場合はクエリで探し直す
+                self._cache.pop(id, None)
+
+        logger.info(f"Partition key for ID {id} not indexed, falling back to cross-partition query")
+        items = [item async for item in lost_items_container.query_items(
+            query=f"SELECT * FROM c WHERE c.id = @id AND {NOT_DELETED_FILTER}",
+            parameters=[{"name": "@id", "value": id}]
+        )]
+        if not items:
+            if partition_key is not None:
+                await self.remove(id)
+            return None
+
+        item = items[0]
+        if item.get(PARTITION_KEY_FIELD) is not None:
+            await self.put(id, item[PARTITION_KEY_FIELD])
+        return item
+
+
+partition_key_index = PartitionKeyIndex()
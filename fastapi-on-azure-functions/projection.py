@@ -0,0 +1,65 @@
+# projection.py
+from typing import List, Optional
+
+from pagination import SORT_FIELD
+
+# 取得可能なフィールド（SELECT 句に埋め込むため、ここにあるものだけを許可する）
+ALLOWED_FIELDS = (
+    "id", "createUserPlace", "findDateTime", "memo", "contact", "color", "createUserID",
+    "currency", "findPlace", "imageUrl", "isValuables", "item", "keyword", "mngmtNo",
+    "personal", "status", "isChecked", "DateFound",
+)
+
+# 名前付きのフィールドセット
+FIELD_PRESETS = {
+    # 検索一覧（カード・テーブル）で表示する項目
+    "summary": [
+        "id", "createUserPlace", "findDateTime", "findPlace", "imageUrl", "item", "color", "keyword", "isChecked",
+    ],
+    # 詳細表示で使用する項目（個人情報・通貨情報は含めない）
+    "detail": [
+        "id", "createUserPlace", "findDateTime", "findPlace", "imageUrl", "item", "color", "keyword", "isChecked",
+        "memo", "mngmtNo", "status", "isValuables", "createUserID", "DateFound",
+    ],
+}
+
+# ページングとマージに必要なため常に取得するフィールド
+REQUIRED_FIELDS = ("id", SORT_FIELD)
+
+
+def resolve_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    `fields` パラメータ（プリセット名またはカンマ区切りのフィールド名）を取得するフィールドのリストに変換する
+    :param fields: 例 "summary", "id,item,color"
+    :return: フィールドのリスト（指定なしの場合は None = 全フィールド）
+    """
+    if not fields:
+        return None
+
+    names = []
+    for name in fields.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name in FIELD_PRESETS:
+            names.extend(FIELD_PRESETS[name])
+        elif name in ALLOWED_FIELDS:
+            names.append(name)
+        else:
+            raise ValueError(f"Unknown field '{name}'")
+
+    resolved = list(REQUIRED_FIELDS)
+    for name in names:
+        if name not in resolved:
+            resolved.append(name)
+    return resolved
+
+
+def select_clause(fields: Optional[List[str]]) -> str:
+    """
+    取得するフィールドから SELECT 句を作成する
+    :param fields: resolve_fields の戻り値
+    """
+    if fields is None:
+        return "SELECT * FROM c"
+    return "SELECT " + ", ".join(f"c.{name}" for name in fields) + " FROM c"
@@ -0,0 +1,165 @@
+# search_cache.py
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import orjson
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 環境変数からキャッシュの設定を取得
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "256"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+def criteria_matches(criteria: dict, document: dict) -> bool:
+    """
+    ドキュメントが検索条件に一致するかを判定する関数（キャッシュの無効化判定に使用）
+    :param criteria: build_lost_item_filters で解決済みの検索条件
+    :param document: LostItems のドキュメント
+    """
+    if criteria.get("createUserPlace") is not None:
+        if document.get("createUserPlace") not in criteria["createUserPlace"]:
+            return False
+    if criteria.get("itemName") is not None:
+        if (document.get("item") or {}).get("itemName") != criteria["itemName"]:
+            return False
+    if criteria.get("keyword") is not None:
+        if criteria["keyword"] not in (document.get("keyword") or []):
+            return False
+    if criteria.get("color") is not None:
+        if (document.get("color") or {}).get("id") != criteria["color"]:
+            return False
+    if criteria.get("findDateTime") is not None:
+        if not document.get("findDateTime") or document["findDateTime"] < criteria["findDateTime"]:
+            return False
+    if criteria.get("isChecked") is not None:
+        if document.get("isChecked") != criteria["isChecked"]:
+            return False
+    return True
+
+
+class SearchResultCache:
+    """
+    GET /lostitems の検索結果をプロセス内に保持するキャッシュ（TTL + LRU、合計サイズ上限付き）
+    キーは解決済みの検索条件とページング条件。書き込み時は、変更前後のドキュメントが
+    検索条件に一致するエントリのみを破棄する。
+    プロセスごとのキャッシュのため、他のインスタンスでの書き込みは TTL が切れるまで反映されない。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        max_bytes: int = SEARCH_CACHE_MAX_BYTES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, criteria, items, size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(criteria: dict, *extra) -> str:
+        """
+        検索条件（と追加のページング条件）からキャッシュキーを作成する
+        """
+        return json.dumps([criteria, *extra], sort_keys=True, ensure_ascii=False, default=str)
+
+    def _remove(self, key: str):
+        _, _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """
+        キャッシュされた検索結果を返す（無い場合、期限切れの場合は None）
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, _, items, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return items
+
+    def put(self, key: str, criteria: dict, items: List[dict]):
+        """
+        検索結果をキャッシュに登録する
+        :param key: make_key で作成したキー
+        :param criteria: 検索条件（無効化の判定に使用）
+        :param items: 検索結果
+        """
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+
+        # エントリのサイズ（UTF-8 の JSON のバイト数）は orjson で計算する（標準の json より大幅に速い）
+        size = len(orjson.dumps(items, default=str))
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, criteria, items, size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def invalidate(self, *documents: Optional[dict]):
+        """
+        変更されたドキュメント（変更前・変更後）に一致する検索条件のエントリを破棄する
+        """
+        documents = [document for document in documents if document]
+        stale_keys = [
+            key for key, (_, criteria, _, _) in self._entries.items()
+            if any(criteria_matches(criteria, document) for document in documents)
+        ]
+        for key in stale_keys:
+            self._remove(key)
+        self.invalidations += len(stale_keys)
+        if stale_keys:
+            logger.info(f"Invalidated {len(stale_keys)} cached search results")
+
+    def clear(self):
+        """すべてのエントリを破棄する"""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        """ヒット率やサイズなどの統計情報を返す"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+search_result_cache = SearchResultCache()
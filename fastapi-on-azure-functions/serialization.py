@@ -0,0 +1,64 @@
+# serialization.py
+from datetime import datetime
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter, ValidationError
+
+from models import LostItem
+
+# LostItem の既定値（必須フィールドは除く）
+# 自前のコンテナから読み込んだドキュメントは LostItemRequest から作成したものなので、
+# 検証をやり直さず、欠けているフィールドに既定値を補うだけでレスポンスと同じ形になる
+LOST_ITEM_DEFAULTS = {
+    name: field.get_default(call_default_factory=True)
+    for name, field in LostItem.model_fields.items()
+    if not field.is_required()
+}
+
+# 日時のフィールド（findDateTime）。保存されている文字列は形式がまちまちなため（例: ...00.000Z、...T10:00）、
+# LostItem で検証してシリアライズした場合と同じ形式に揃える
+DATETIME_FIELDS = {
+    name: TypeAdapter(field.annotation)
+    for name, field in LostItem.model_fields.items()
+    if datetime in getattr(field.annotation, "__args__", (field.annotation,))
+}
+
+
+def _normalize_datetimes(document: dict) -> dict:
+    """
+    日時のフィールドを LostItem の JSON 出力と同じ形式に変換する（変換できない値はそのまま返す）
+    """
+    for name, adapter in DATETIME_FIELDS.items():
+        value = document.get(name)
+        if isinstance(value, str):
+            try:
+                document[name] = adapter.dump_python(adapter.validate_python(value), mode="json")
+            except ValidationError:
+                pass
+    return document
+
+
+def trusted_lost_item(document: dict) -> dict:
+    """
+    Cosmos DB から読み込んだドキュメントを、Pydantic の検証を行わずに LostItem の形に整える
+    :param document: LostItems（または LostItemsBySubcategory）のドキュメント
+    """
+    return _normalize_datetimes({**LOST_ITEM_DEFAULTS, **document})
+
+
+def trusted_lost_items_response(items: List[dict], projected: bool = False) -> List[dict]:
+    """
+    レスポンス用のリストを作成する（射影したドキュメントは取得したフィールドのみを返す）
+    :param items: Cosmos DB から読み込んだドキュメント
+    :param projected: fields で取得するフィールドを指定したかどうか
+    """
+    if projected:
+        return [_normalize_datetimes(dict(item)) for item in items]
+    return [trusted_lost_item(item) for item in items]
+
+
+def dumps_line(document: dict) -> bytes:
+    """ドキュメントを NDJSON の1行にシリアライズする"""
+    return orjson.dumps(document) + b"\n"
+
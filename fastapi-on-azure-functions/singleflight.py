@@ -0,0 +1,52 @@
+# singleflight.py
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, TypeVar
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    同じキーの処理が実行中の場合、新たに実行せず実行中の結果を共有する（リクエストの集約）
+    例: 同じフリーワードで同時に検索された場合、GPT への問い合わせは1回だけ行う
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+
+    async def do(self, key: str, function: Callable[[], Awaitable[T]]) -> T:
+        """
+        キーごとに function を1回だけ実行し、同時に呼び出した全員に同じ結果（または例外）を返す
+        :param key: 集約のキー（正規化済みの入力など）
+        :param function: 実行する非同期関数（引数なし）
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.create_task(function())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.collapsed += 1
+            logger.info(f"Joined in-flight call: {key}")
+
+        # 呼び出し側の1人がキャンセル（タイムアウト）されても、他の呼び出し側の処理は継続させる
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """集約の統計情報を返す"""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "inFlight": len(self._in_flight),
+        }
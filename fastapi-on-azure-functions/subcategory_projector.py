@@ -0,0 +1,74 @@
+# subcategory_projector.py
+import asyncio
+import logging
+from typing import Iterable, Optional
+
+from database import DELETED_FIELD, delete_items_by_partition, get_lost_item_by_subcategory_container
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# LostItemsBySubcategory のパーティションキーとなるフィールド
+SUBCATEGORY_FIELD = "Subcategory"
+
+# Cosmos DB が付与するシステムプロパティ（ビューには複製しない）
+SYSTEM_PROPERTIES = ("_rid", "_self", "_etag", "_attachments", "_ts", "_lsn")
+
+
+def get_subcategory(item: dict) -> Optional[str]:
+    """
+    忘れ物データから中分類（item.itemName）を取得する
+    :param item: LostItems のドキュメント
+    :return: 中分類（未設定の場合は None）
+    """
+    return (item.get("item") or {}).get("itemName")
+
+
+def to_subcategory_view(item: dict) -> Optional[dict]:
+    """
+    LostItems のドキュメントから LostItemsBySubcategory 用のドキュメントを作成する
+    id は元のドキュメントと同じにするため、同じ変更を何度処理しても結果は変わらない。
+    :param item: LostItems のドキュメント
+    :return: ビュー用のドキュメント（中分類が未設定の場合は None）
+    """
+    subcategory = get_subcategory(item)
+    if not subcategory:
+        return None
+
+    view = {key: value for key, value in item.items() if key not in SYSTEM_PROPERTIES}
+    view[SUBCATEGORY_FIELD] = subcategory
+    return view
+
+
+async def project(documents: Iterable[dict]) -> int:
+    """
+    変更フィードで受け取った LostItems のドキュメントを LostItemsBySubcategory に反映する関数
+    論理削除されたドキュメントはビューから削除し、それ以外は upsert する。
+    削除も変更フィードで順番に処理するため、削除前の変更が削除後に書き戻されることはない。
+    :param documents: 変更されたドキュメント
+    :return: 反映（upsert・削除）した件数
+    """
+    views = []
+    ids_by_subcategory = {}  # 中分類 -> 論理削除された id のリスト
+    for document in documents:
+        if document.get(DELETED_FIELD):
+            subcategory = get_subcategory(document)
+            if subcategory:
+                ids_by_subcategory.setdefault(subcategory, []).append(document["id"])
+            continue
+        view = to_subcategory_view(document)
+        if view:
+            views.append(view)
+
+    removed = sum(len(ids) for ids in ids_by_subcategory.values())
+    if not views and not removed:
+        return 0
+
+    container = await get_lost_item_by_subcategory_container()
+    await asyncio.gather(
+        *[container.upsert_item(body=view) for view in views],
+        delete_items_by_partition(container, ids_by_subcategory)
+    )
+    logger.info(f"Projected {len(views)} items into LostItemsBySubcategory, removed {removed} deleted items")
+    return len(views) + removed
@@ -1,12 +1,18 @@
 # table_storage.py
 
-from azure.data.tables import TableServiceClient, TableClient, UpdateMode
-from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
-from azure.identity import DefaultAzureCredential
-from typing import Optional
+from azure.data.tables import UpdateMode
+from azure.data.tables.aio import TableClient
+from azure.data.tables import TableTransactionError
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.identity.aio import DefaultAzureCredential
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
 import os
+import re
+import time
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 
 # ロギングの設定
@@ -16,24 +22,303 @@ logger = logging.getLogger(__name__)
 # 環境変数からテーブルストレージのエンドポイントを取得
 TABLE_ENDPOINT = os.getenv("AZURE_TABLE_ENDPOINT")  # 例: https://<your-storage-account>.table.core.windows.net/
 TABLE_NAME = "LostItems"
+# 重複を除いたキーワードと登録件数を保持するテーブル（PartitionKey = itemType, RowKey = キーワード）
+KEYWORD_INDEX_TABLE_NAME = os.getenv("KEYWORD_INDEX_TABLE_NAME", "LostItemKeywords")
+# 件数の更新が競合した場合の再試行回数
+KEYWORD_INDEX_MAX_RETRIES = 5
+# キーワードのテーブルの作成が完了しているかを記録するエンティティ（keyword 列を持たないため一覧には含まれない）
+KEYWORD_INDEX_MARKER_PARTITION_KEY = "__index__"
+KEYWORD_INDEX_MARKER_ROW_KEY = "rebuild"
+# 完了の記録を確認する間隔（秒）。記録が無い・未完了の場合は作り直す
+KEYWORD_INDEX_CHECK_SECONDS = float(os.getenv("KEYWORD_INDEX_CHECK_SECONDS", "300"))
+# RowKey の時刻部分（新しいものほど小さい値になるよう、この値からエポックからのマイクロ秒を引く）
+INVERTED_TIMESTAMP_MAX = 10 ** 17
+# 時刻順の RowKey（"t" + 反転した時刻 + "_" + UUID）。旧形式の UUID（16 進数）と区別するため先頭に "t" を付ける
+TIME_ORDERED_ROW_KEY = re.compile(r"^t\d{17}_")
+# findDate の指定値と、何日前からを対象とするか
+FIND_DATE_DAYS = {"today": 0, "yesterday": 1, "last_week": 7, "last_month": 28}
+# 1回のトランザクションにまとめる操作数（Table Storage の上限は 100）
+TABLE_BATCH_SIZE = min(100, int(os.getenv("TABLE_BATCH_SIZE", "100")))
+# 同時に送信するトランザクションの数
+TABLE_BATCH_CONCURRENCY = int(os.getenv("TABLE_BATCH_CONCURRENCY", "8"))
 
-# DefaultAzureCredentialを使用してTableServiceClientを初期化
-credential = DefaultAzureCredential()
-table_service_client = TableServiceClient(endpoint=TABLE_ENDPOINT, credential=credential)
+# テーブルクライアント（非同期）はプロセス内で1つだけ生成し、全リクエストで共有する
+# 接続プールはクライアント内部の HTTP セッションで管理される（明示的には閉じず、プロセスの終了時に解放される）
+_table_client = None
+_index_client = None
+_init_lock = asyncio.Lock()
+# キーワードのテーブルの完了の記録を最後に確認した時刻
+_index_checked_at = None
+_index_lock = asyncio.Lock()
 
-async def get_table_client():
+
+async def _create_table(table_client: TableClient) -> bool:
+    """
+    テーブルが存在しない場合は作成する
+    :return: 新しく作成した場合は True
+    """
     try:
-        table_client = table_service_client.get_table_client(table_name=TABLE_NAME)
-        # テーブルが存在しない場合は作成
-        table_client.create_table()
-        logger.info(f"Table '{TABLE_NAME}' is ready.")
-        return table_client
+        await table_client.create_table()
+        logger.info(f"Table '{table_client.table_name}' is ready.")
+        return True
     except ResourceExistsError:
-        logger.info(f"Table '{TABLE_NAME}' already exists.")
-        return table_service_client.get_table_client(table_name=TABLE_NAME)
+        logger.info(f"Table '{table_client.table_name}' already exists.")
+        return False
+
+
+async def _initialize():
+    """テーブルクライアントを初回アクセス時に初期化し、テーブルが存在しない場合は作成する（1回だけ実行）"""
+    global _table_client, _index_client
+
+    async with _init_lock:
+        if _table_client is not None:
+            return
+
+        credential = DefaultAzureCredential()
+        table_client = TableClient(endpoint=TABLE_ENDPOINT, table_name=TABLE_NAME, credential=credential)
+        index_client = TableClient(endpoint=TABLE_ENDPOINT, table_name=KEYWORD_INDEX_TABLE_NAME, credential=credential)
+        try:
+            await _create_table(table_client)
+            await _create_table(index_client)
+        except Exception as e:
+            logger.error(f"Failed to create or get table '{TABLE_NAME}': {e}")
+            await table_client.close()
+            await index_client.close()
+            await credential.close()
+            raise
+
+        _table_client = table_client
+        _index_client = index_client
+
+
+async def get_table_client() -> TableClient:
+    """共有しているテーブルクライアントを返す"""
+    if _table_client is None:
+        await _initialize()
+    return _table_client
+
+
+async def get_keyword_index_client() -> TableClient:
+    """共有しているキーワードのテーブルのクライアントを返す"""
+    if _index_client is None:
+        await _initialize()
+    return _index_client
+
+
+def _keyword_row_key(keyword: str) -> str:
+    """
+    キーワードを RowKey に使用できる文字列に変換する（RowKey に使用できない / \\ # ? と制御文字、% をエスケープ）
+    """
+    return "".join(
+        f"%{ord(c):02X}" if c in "/\\#?%" or ord(c) < 0x20 or 0x7F <= ord(c) <= 0x9F else c
+        for c in keyword
+    )
+
+
+async def _increment_keyword_count(index_client: TableClient, item_type: str, keyword: str, amount: int = 1):
+    """
+    キーワードの登録件数を amount 件増やす（ETag による楽観的同時実行制御で、競合した場合は再試行する）
+    """
+    row_key = _keyword_row_key(keyword)
+    for _ in range(KEYWORD_INDEX_MAX_RETRIES):
+        try:
+            entity = await index_client.get_entity(partition_key=item_type, row_key=row_key)
+        except ResourceNotFoundError:
+            try:
+                await index_client.create_entity(
+                    entity={"PartitionKey": item_type, "RowKey": row_key, "keyword": keyword, "count": amount}
+                )
+                return
+            except ResourceExistsError:
+                continue
+
+        try:
+            await index_client.update_entity(
+                entity={"PartitionKey": item_type, "RowKey": row_key, "count": entity.get("count", 0) + amount},
+                mode=UpdateMode.MERGE,
+                etag=entity.metadata["etag"],
+                match_condition=MatchConditions.IfNotModified
+            )
+            return
+        except (ResourceModifiedError, ResourceNotFoundError):
+            continue
+
+    raise RuntimeError(f"Failed to update keyword count for '{keyword}' after {KEYWORD_INDEX_MAX_RETRIES} attempts")
+
+
+async def _rebuild_keyword_index(table_client: TableClient, index_client: TableClient) -> int:
+    """
+    ラベルのテーブルを走査して、キーワードのテーブルを作り直す（既存のデータからの移行用）
+    :return: キーワードの件数（分類ごと）
+    """
+    counts = {}  # (itemType, keyword) -> 件数
+    async for entity in table_client.list_entities(select=["PartitionKey", "keyword"]):
+        if entity.get("keyword"):
+            key = (entity["PartitionKey"], entity["keyword"])
+            counts[key] = counts.get(key, 0) + 1
+
+    by_partition = {}
+    for (item_type, keyword), count in counts.items():
+        by_partition.setdefault(item_type, []).append(
+            ("upsert", {"PartitionKey": item_type, "RowKey": _keyword_row_key(keyword), "keyword": keyword, "count": count}, {"mode": UpdateMode.REPLACE})
+        )
+
+    semaphore = asyncio.Semaphore(TABLE_BATCH_CONCURRENCY)
+
+    async def submit(operations: list):
+        async with semaphore:
+            await index_client.submit_transaction(operations)
+
+    await asyncio.gather(*[
+        submit(operations[i:i + TABLE_BATCH_SIZE])
+        for operations in by_partition.values()
+        for i in range(0, len(operations), TABLE_BATCH_SIZE)
+    ])
+
+    # ラベルが残っていないキーワードを削除する
+    expected = {(item_type, _keyword_row_key(keyword)) for item_type, keyword in counts}
+
+    async def stale_entities():
+        async for entity in index_client.list_entities(select=["PartitionKey", "RowKey"]):
+            if entity["PartitionKey"] == KEYWORD_INDEX_MARKER_PARTITION_KEY:
+                continue
+            if (entity["PartitionKey"], entity["RowKey"]) not in expected:
+                yield entity
+
+    await _delete_entities(index_client, stale_entities())
+    logger.info(f"Rebuilt keyword index '{KEYWORD_INDEX_TABLE_NAME}' with {len(counts)} keywords.")
+    return len(counts)
+
+
+async def _ensure_keyword_index():
+    """
+    キーワードのテーブルの完了の記録を確認し、無い・未完了の場合は既存のラベルから作り直す
+    （作成途中で失敗した場合、他のインスタンスが作成中の場合、件数の更新に失敗した場合も作り直す）
+    記録の確認は KEYWORD_INDEX_CHECK_SECONDS ごとに1回だけ行う
+    """
+    global _index_checked_at
+
+    if _index_checked_at is not None and time.monotonic() - _index_checked_at < KEYWORD_INDEX_CHECK_SECONDS:
+        return
+
+    async with _index_lock:
+        if _index_checked_at is not None and time.monotonic() - _index_checked_at < KEYWORD_INDEX_CHECK_SECONDS:
+            return
+
+        table_client = await get_table_client()
+        index_client = await get_keyword_index_client()
+        try:
+            marker = await index_client.get_entity(
+                partition_key=KEYWORD_INDEX_MARKER_PARTITION_KEY, row_key=KEYWORD_INDEX_MARKER_ROW_KEY
+            )
+            complete = bool(marker.get("complete"))
+        except ResourceNotFoundError:
+            complete = False
+
+        if not complete:
+            logger.info(f"Keyword index '{KEYWORD_INDEX_TABLE_NAME}' is incomplete; rebuilding from labels.")
+            await _rebuild_keyword_index(table_client, index_client)
+            await index_client.upsert_entity(
+                entity={
+                    "PartitionKey": KEYWORD_INDEX_MARKER_PARTITION_KEY,
+                    "RowKey": KEYWORD_INDEX_MARKER_ROW_KEY,
+                    "complete": True,
+                    "rebuiltAt": datetime.utcnow().isoformat()
+                },
+                mode=UpdateMode.REPLACE
+            )
+        _index_checked_at = time.monotonic()
+
+
+async def _mark_keyword_index_stale():
+    """
+    件数の更新に失敗したことを記録し、次の確認時（他のインスタンスを含む）にキーワードのテーブルを作り直させる
+    """
+    global _index_checked_at
+
+    _index_checked_at = None
+    try:
+        index_client = await get_keyword_index_client()
+        await index_client.upsert_entity(
+            entity={
+                "PartitionKey": KEYWORD_INDEX_MARKER_PARTITION_KEY,
+                "RowKey": KEYWORD_INDEX_MARKER_ROW_KEY,
+                "complete": False
+            },
+            mode=UpdateMode.REPLACE
+        )
     except Exception as e:
-        logger.error(f"Failed to create or get table '{TABLE_NAME}': {e}")
-        raise
+        logger.error(f"Failed to mark keyword index as stale: {e}")
+
+
+def _to_utc(value: datetime) -> datetime:
+    """タイムゾーン付きの日時を UTC（タイムゾーンなし）に変換する"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _inverted_timestamp(value: datetime) -> int:
+    """日時を、新しいものほど小さくなる整数に変換する"""
+    return INVERTED_TIMESTAMP_MAX - (_to_utc(value) - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+
+
+def make_row_key(found_at: datetime) -> str:
+    """
+    時刻順の RowKey を生成する（同じ PartitionKey 内で新しいものから順に並ぶ）
+    :param found_at: 登録日時
+    """
+    return f"t{_inverted_timestamp(found_at):017d}_{uuid.uuid4()}"
+
+
+def _row_key_range_filter(date_from: Optional[datetime], date_to: Optional[datetime]) -> str:
+    """
+    登録日時が date_from 以上 date_to 未満のエンティティを RowKey の範囲で絞り込むフィルタを作成する
+    （時刻順の RowKey に移行していない旧形式のエンティティは含まれない）
+    """
+    # date_to より前 = 反転した時刻が date_to のものより大きい
+    lower = f"t{_inverted_timestamp(date_to) + 1:017d}" if date_to else "t"
+    # date_from 以降 = 反転した時刻が date_from のもの以下
+    upper = f"t{_inverted_timestamp(date_from) + 1:017d}" if date_from else "u"
+    return f"RowKey ge '{lower}' and RowKey lt '{upper}'"
+
+
+def _found_at(entity: dict) -> datetime:
+    """
+    エンティティの登録日時を返す（DateFound、Timestamp 列、サービスのタイムスタンプの順に使用）
+    """
+    for value in (entity.get("DateFound"), entity.get("Timestamp")):
+        if isinstance(value, datetime):
+            return _to_utc(value)
+        if isinstance(value, str):
+            try:
+                return _to_utc(datetime.fromisoformat(value))
+            except ValueError:
+                pass
+    metadata = getattr(entity, "metadata", None) or {}
+    if isinstance(metadata.get("timestamp"), datetime):
+        return _to_utc(metadata["timestamp"])
+    return datetime.utcnow()
+
+
+def _make_entity(data: dict) -> dict:
+    """
+    遺失物データから登録するエンティティを作成する（PartitionKey = itemType, RowKey = 時刻順の一意なキー）
+    """
+    partition_key = data.get("itemType", "Unknown")
+
+    # タイムスタンプの設定
+    timestamp = datetime.utcnow().isoformat()
+
+    # 一意で時刻順のRowKeyを生成（反転した登録日時 + UUID）
+    row_key = make_row_key(_found_at({"DateFound": data.get("DateFound"), "Timestamp": timestamp}))
+
+    return {
+        "PartitionKey": partition_key,
+        "RowKey": row_key,
+        "Timestamp": timestamp,
+        **data
+    }
 
 
 async def add_lost_item(data: dict) -> dict:
@@ -43,27 +328,25 @@ async def add_lost_item(data: dict) -> dict:
     :return: 追加されたデータの辞書
     """
     try:
-        # 一意のRowKeyを生成（UUIDを使用）
-        row_key = str(uuid.uuid4())
-        partition_key = data.get("itemType", "Unknown")
-
-        # タイムスタンプの設定
-        timestamp = datetime.utcnow().isoformat()
-
-        entity = {
-            "PartitionKey": partition_key,
-            "RowKey": row_key,
-            "Timestamp": timestamp,
-            **data
-        }
+        entity = _make_entity(data)
+        partition_key = entity["PartitionKey"]
+        row_key = entity["RowKey"]
 
         logger.info(f"Adding lost item with RowKey: {entity}")
 
-        # テーブルクライアントの取得を非同期に実行
         table_client = await get_table_client()
 
-        table_client.create_entity(entity=entity)
+        await table_client.create_entity(entity=entity)
         logger.info(f"Added lost item with RowKey: {row_key}")
+
+        # キーワードのテーブルの件数を更新
+        if entity.get("keyword"):
+            try:
+                await _increment_keyword_count(await get_keyword_index_client(), partition_key, entity["keyword"])
+            except Exception as e:
+                logger.error(f"Failed to update keyword index for '{entity['keyword']}': {e}")
+                await _mark_keyword_index_stale()
+
         return entity
 
     except ResourceExistsError:
@@ -73,37 +356,164 @@ async def add_lost_item(data: dict) -> dict:
         logger.error(f"Failed to add lost item: {e}")
         raise
 
+async def _create_chunk(table_client: TableClient, entities: list) -> list:
+    """
+    同じ PartitionKey のエンティティを1回のトランザクションで追加する
+    トランザクションが失敗した場合（接続エラー・413・503 なども含む）は、行ごとの結果を得るために1件ずつ追加し直す
+    :return: エンティティごとのエラー（成功した場合は None）のリスト
+    """
+    try:
+        await table_client.submit_transaction([("create", entity) for entity in entities])
+        return [None] * len(entities)
+    except TableTransactionError as e:
+        logger.warning(f"Batch insert failed for PartitionKey '{entities[0]['PartitionKey']}', inserting one by one: {e}")
+    except Exception as e:
+        logger.warning(f"Batch insert request failed for PartitionKey '{entities[0]['PartitionKey']}', inserting one by one: {e}")
+
+    errors = []
+    for entity in entities:
+        try:
+            await table_client.create_entity(entity=entity)
+            errors.append(None)
+        except ResourceExistsError:
+            # RowKey は UUID を含み一意のため、既に存在する場合は応答を受け取れなかったトランザクションで登録済み
+            errors.append(None)
+        except Exception as e:
+            errors.append(str(e))
+    return errors
+
+
+def _count_created(results: List[dict]) -> dict:
+    """
+    登録できた行を (itemType, keyword) ごとに数える
+    """
+    counts = {}
+    for result in results:
+        if result["status"] == "created":
+            key = (result["PartitionKey"], result["keyword"])
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+async def add_lost_items_bulk(items: AsyncIterator[Tuple[int, dict]]) -> List[dict]:
+    """
+    遺失物データを PartitionKey（itemType）ごとにまとめ、最大 TABLE_BATCH_SIZE 件のトランザクションで追加する関数
+    トランザクションは TABLE_BATCH_CONCURRENCY 件まで並列に送信し、キーワードのテーブルは最後にまとめて更新する
+    :param items: 行番号と遺失物データの組の非同期イテレータ（受信しながら順に追加する）
+    :return: 行ごとの結果（row, status = created / failed, keyword, PartitionKey, RowKey または error）のリスト
+    """
+    table_client = await get_table_client()
+    semaphore = asyncio.Semaphore(TABLE_BATCH_CONCURRENCY)
+    tasks = []
+    pending = {}  # PartitionKey -> (行番号, エンティティ) のリスト
+
+    async def submit(chunk: list) -> list:
+        try:
+            errors = await _create_chunk(table_client, [entity for _, entity in chunk])
+        finally:
+            semaphore.release()
+        return [
+            {"row": row, "status": "created", "keyword": entity.get("keyword"), "PartitionKey": entity["PartitionKey"], "RowKey": entity["RowKey"]}
+            if error is None else
+            {"row": row, "status": "failed", "error": error}
+            for (row, entity), error in zip(chunk, errors)
+        ]
+
+    async def schedule(chunk: list):
+        # 同時実行数に達している場合は、空くまで受信を待つ
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(submit(chunk)))
+
+    try:
+        async for row, data in items:
+            entity = _make_entity(data)
+            chunk = pending.setdefault(entity["PartitionKey"], [])
+            chunk.append((row, entity))
+            if len(chunk) >= TABLE_BATCH_SIZE:
+                await schedule(pending.pop(entity["PartitionKey"]))
+        for chunk in pending.values():
+            await schedule(chunk)
+        results = [result for chunk_results in await asyncio.gather(*tasks) for result in chunk_results]
+    except Exception:
+        # 送信済みのチャンク（_create_chunk は例外を送出しない）の完了を待ち、登録できた行の件数を反映してからエラーにする
+        results = [result for chunk_results in await asyncio.gather(*tasks) for result in chunk_results]
+        await _update_keyword_counts(_count_created(results))
+        raise
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            # 中断したチャンクが登録済みの可能性があるため、キーワードのテーブルを作り直させる
+            asyncio.get_running_loop().create_task(_mark_keyword_index_stale())
+        raise
+
+    # キーワードのテーブルの件数をまとめて更新
+    counts = _count_created(results)  # (itemType, keyword) -> 追加した件数
+    await _update_keyword_counts(counts)
+
+    logger.info(f"Bulk added {sum(counts.values())} of {len(results)} lost items.")
+    return results
+
+
+async def _update_keyword_counts(counts: dict):
+    """
+    キーワードのテーブルの件数を、キーワードごとに1回ずつ並列に更新する
+    更新できなかった場合は、キーワードのテーブルを作り直させる
+    :param counts: (itemType, keyword) -> 増やす件数 の辞書
+    """
+    if not any(keyword for _, keyword in counts):
+        return
+    try:
+        index_client = await get_keyword_index_client()
+    except Exception as e:
+        logger.error(f"Failed to get keyword index client: {e}")
+        await _mark_keyword_index_stale()
+        return
+    semaphore = asyncio.Semaphore(TABLE_BATCH_CONCURRENCY)
+
+    async def increment(item_type: str, keyword: str, amount: int) -> bool:
+        async with semaphore:
+            try:
+                await _increment_keyword_count(index_client, item_type, keyword, amount)
+                return True
+            except Exception as e:
+                logger.error(f"Failed to update keyword index for '{keyword}': {e}")
+                return False
+
+    succeeded = await asyncio.gather(*[increment(item_type, keyword, amount) for (item_type, keyword), amount in counts.items() if keyword])
+    if not all(succeeded):
+        await _mark_keyword_index_stale()
+
+
 async def list_lost_items(filters: Optional[dict] = None) -> list:
     """
     Azure Table Storageから遺失物データを一覧取得する関数
-    :param filters: フィルタリング条件の辞書
-    :return: 遺失物データのリスト
+    :param filters: フィルタリング条件の辞書（findDate, from, to は登録日時の範囲として RowKey で絞り込む）
+    :return: 遺失物データのリスト（日時で絞り込んだ場合は新しい順）
     """
     try:
         table_client = await get_table_client()
         query_filter = ""
+        date_from = date_to = None
         if filters:
             filter_clauses = []
             for key, value in filters.items():
                 if key == "findDate":
-                    # 日付フィルタはISO形式に変換
-                    if value == 'today':
-                        date = datetime.utcnow().date()
-                        filter_clauses.append(f"LostDateTime ge '{date.isoformat()}'")
-                    elif value == 'yesterday':
-                        date = datetime.utcnow().date() - timedelta(days=1)
-                        filter_clauses.append(f"LostDateTime ge '{date.isoformat()}'")
-                    elif value == 'last_week':
-                        date = datetime.utcnow().date() - timedelta(weeks=1)
-                        filter_clauses.append(f"LostDateTime ge '{date.isoformat()}'")
-                    elif value == 'last_month':
-                        date = datetime.utcnow().date() - timedelta(weeks=4)
-                        filter_clauses.append(f"LostDateTime ge '{date.isoformat()}'")
+                    # 指定日数前の0時以降
+                    if value in FIND_DATE_DAYS:
+                        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+                        date_from = today - timedelta(days=FIND_DATE_DAYS[value])
+                elif key == "from":
+                    date_from = value
+                elif key == "to":
+                    date_to = value
                 elif key == "keyword":
                     # キーワードフィルタ
                     filter_clauses.append(f"keyword eq '{value}'")
                 else:
                     filter_clauses.append(f"{key} eq '{value}'")
+            if date_from or date_to:
+                filter_clauses.append(_row_key_range_filter(date_from, date_to))
             query_filter = " and ".join(filter_clauses)
 
         if query_filter:
@@ -111,7 +521,10 @@ async def list_lost_items(filters: Optional[dict] = None) -> list:
         else:
             entities = table_client.list_entities()
 
-        items = [dict(entity) for entity in entities]
+        items = [dict(entity) async for entity in entities]
+        if date_from or date_to:
+            # パーティションをまたいで新しい順に並べる
+            items.sort(key=lambda item: item["RowKey"])
         logger.info(f"Retrieved {len(items)} items from Azure Table Storage.")
         return items
 
@@ -119,41 +532,207 @@ async def list_lost_items(filters: Optional[dict] = None) -> list:
         logger.error(f"Failed to list lost items: {e}")
         raise
 
-async def delete_all_labels():
+async def _delete_chunk(table_client: TableClient, partition_key: str, row_keys: list) -> int:
+    """
+    同じ PartitionKey のエンティティを1回のトランザクションで削除する
+    途中で他のリクエストに削除されていた場合などトランザクションが失敗したときは、1件ずつ削除し直す
+    :return: 削除した件数
+    """
+    operations = [("delete", {"PartitionKey": partition_key, "RowKey": row_key}) for row_key in row_keys]
+    try:
+        await table_client.submit_transaction(operations)
+        return len(operations)
+    except TableTransactionError as e:
+        logger.warning(f"Batch delete failed for PartitionKey '{partition_key}', deleting one by one: {e}")
+
+    deleted_count = 0
+    for row_key in row_keys:
+        try:
+            await table_client.delete_entity(partition_key=partition_key, row_key=row_key)
+            deleted_count += 1
+        except ResourceNotFoundError:
+            pass
+    return deleted_count
+
+
+async def _delete_entities(table_client: TableClient, entities) -> int:
+    """
+    エンティティを PartitionKey ごとにまとめ、最大 TABLE_BATCH_SIZE 件のトランザクションで削除する
+    トランザクションは TABLE_BATCH_CONCURRENCY 件まで並列に送信する
+    :param entities: PartitionKey と RowKey を持つエンティティの非同期イテレータ
+    :return: 削除した件数
+    """
+    semaphore = asyncio.Semaphore(TABLE_BATCH_CONCURRENCY)
+    tasks = []
+    pending = {}  # PartitionKey -> RowKey のリスト
+
+    async def submit(partition_key: str, row_keys: list) -> int:
+        try:
+            return await _delete_chunk(table_client, partition_key, row_keys)
+        finally:
+            semaphore.release()
+
+    async def schedule(partition_key: str, row_keys: list):
+        # 同時実行数に達している場合は、空くまで一覧の取得を待つ
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(submit(partition_key, row_keys)))
+
+    try:
+        async for entity in entities:
+            row_keys = pending.setdefault(entity["PartitionKey"], [])
+            row_keys.append(entity["RowKey"])
+            if len(row_keys) >= TABLE_BATCH_SIZE:
+                await schedule(entity["PartitionKey"], pending.pop(entity["PartitionKey"]))
+        for partition_key, row_keys in pending.items():
+            await schedule(partition_key, row_keys)
+        return sum(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def delete_all_labels() -> dict:
     """
     Azure Table Storage内の全ての遺失物データを削除する関数
+    :return: 削除した件数（deleted）と所要時間（durationSeconds）
     """
     try:
+        start = time.perf_counter()
         table_client = await get_table_client()
-        entities = table_client.list_entities()
-        for entity in entities:
-            table_client.delete_entity(partition_key=entity["PartitionKey"], row_key=entity["RowKey"])
-        logger.info("All lost items have been deleted.")
+        entities = table_client.list_entities(select=["PartitionKey", "RowKey"])
+        deleted_count = await _delete_entities(table_client, entities)
+
+        # キーワードのテーブルもすべて削除（完了の記録は残す）
+        index_client = await get_keyword_index_client()
+        await _delete_entities(index_client, index_client.query_entities(
+            "PartitionKey ne @marker",
+            parameters={"marker": KEYWORD_INDEX_MARKER_PARTITION_KEY},
+            select=["PartitionKey", "RowKey"]
+        ))
+
+        duration = time.perf_counter() - start
+        logger.info(f"All lost items have been deleted: {deleted_count} items in {duration:.2f}s")
+        return {"deleted": deleted_count, "durationSeconds": round(duration, 3)}
     except Exception as e:
         logger.error(f"Failed to delete all lost items: {e}")
         raise
 
-async def delete_lost_items_by_keyword(keyword: str):
+async def delete_lost_items_by_keyword(keyword: str) -> dict:
     """
     指定されたキーワードを持つ遺失物データを削除する関数
     :param keyword: 削除対象のキーワード
+    :return: 削除した件数（deleted）と所要時間（durationSeconds）
     """
     try:
+        start = time.perf_counter()
         table_client = await get_table_client()
 
-        # キーワードに一致するエンティティをクエリ
-        filter_query = f"keyword eq '{keyword}'"
-        entities = table_client.query_entities(filter_query)
+        # キーワードに一致するエンティティをクエリ（PartitionKey と RowKey のみを取得）
+        entities = table_client.query_entities(
+            "keyword eq @keyword",
+            parameters={"keyword": keyword},
+            select=["PartitionKey", "RowKey"]
+        )
+        deleted_count = await _delete_entities(table_client, entities)
 
-        deleted_count = 0
-        for entity in entities:
-            partition_key = entity['PartitionKey']
-            row_key = entity['RowKey']
-            table_client.delete_entity(partition_key=partition_key, row_key=row_key)
-            logger.info(f"Deleted entity with PartitionKey: {partition_key}, RowKey: {row_key}")
-            deleted_count += 1
+        # キーワードのテーブルから、すべての分類の該当キーワードを削除
+        index_client = await get_keyword_index_client()
+        await _delete_entities(index_client, index_client.query_entities(
+            "keyword eq @keyword",
+            parameters={"keyword": keyword},
+            select=["PartitionKey", "RowKey"]
+        ))
+
+        duration = time.perf_counter() - start
 
-        logger.info(f"Deleted {deleted_count} items with keyword '{keyword}'")
+        logger.info(f"Deleted {deleted_count} items with keyword '{keyword}' in {duration:.2f}s")
+        return {"deleted": deleted_count, "durationSeconds": round(duration, 3)}
     except Exception as e:
         logger.error(f"Failed to delete items with keyword '{keyword}': {e}")
         raise
+
+async def migrate_row_keys() -> dict:
+    """
+    旧形式（UUID）の RowKey のエンティティを時刻順の RowKey に移行する関数
+    同じ PartitionKey 内で、新しい RowKey での追加と旧エンティティの削除を1つのトランザクションで行う
+    :return: 移行した件数（migrated）と所要時間（durationSeconds）
+    """
+    try:
+        start = time.perf_counter()
+        table_client = await get_table_client()
+        semaphore = asyncio.Semaphore(TABLE_BATCH_CONCURRENCY)
+
+        tasks = []
+
+        async def submit(operations: list):
+            try:
+                await table_client.submit_transaction(operations)
+            finally:
+                semaphore.release()
+
+        async def schedule(operations: list):
+            # 同時実行数に達している場合は、空くまで一覧の取得を待つ
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(submit(operations)))
+
+        # 追加と削除で2操作になるため、1トランザクションあたり TABLE_BATCH_SIZE // 2 件ずつ移行する
+        chunk_size = TABLE_BATCH_SIZE // 2
+        pending = {}  # PartitionKey -> 操作のリスト
+        migrated_count = 0
+        async for entity in table_client.list_entities():
+            if TIME_ORDERED_ROW_KEY.match(entity["RowKey"]):
+                continue
+            partition_key = entity["PartitionKey"]
+            operations = pending.setdefault(partition_key, [])
+            operations.append(("create", {**entity, "RowKey": make_row_key(_found_at(entity))}))
+            operations.append(("delete", {"PartitionKey": partition_key, "RowKey": entity["RowKey"]}))
+            migrated_count += 1
+            if len(operations) >= chunk_size * 2:
+                await schedule(pending.pop(partition_key))
+        for operations in pending.values():
+            await schedule(operations)
+        await asyncio.gather(*tasks)
+
+        duration = time.perf_counter() - start
+        logger.info(f"Migrated {migrated_count} items to time-ordered RowKeys in {duration:.2f}s")
+        return {"migrated": migrated_count, "durationSeconds": round(duration, 3)}
+    except Exception as e:
+        logger.error(f"Failed to migrate RowKeys: {e}")
+        raise
+
+async def list_keywords(item_type: Optional[str] = None) -> List[str]:
+    """
+    キーワードのテーブルから、重複を除いたキーワードの一覧を取得する関数（keyword 列のみを取得する）
+    :param item_type: 分類（指定した場合はその分類のキーワードのみ）
+    :return: キーワードのリスト
+    """
+    await _ensure_keyword_index()
+    index_client = await get_keyword_index_client()
+    if item_type:
+        entities = index_client.query_entities(
+            "PartitionKey eq @item_type",
+            parameters={"item_type": item_type},
+            select=["keyword"]
+        )
+    else:
+        entities = index_client.list_entities(select=["keyword"])
+    keywords = sorted({entity["keyword"] async for entity in entities if entity.get("keyword")})
+    logger.info(f"Retrieved {len(keywords)} distinct keywords from Azure Table Storage.")
+    return keywords
+
+async def scan_keywords() -> dict:
+    """
+    重複を除いたキーワードと、その分類（PartitionKey = itemType）をキーワードのテーブルから取得する関数
+    （PartitionKey と keyword 列のみを取得する）
+    :return: キーワード -> 分類の集合 の辞書
+    """
+    await _ensure_keyword_index()
+    index_client = await get_keyword_index_client()
+    entities = index_client.list_entities(select=["PartitionKey", "keyword"])
+    keywords = {}
+    async for entity in entities:
+        if entity.get("keyword"):
+            keywords.setdefault(entity["keyword"], set()).add(entity["PartitionKey"])
+    logger.info(f"Scanned {len(keywords)} distinct keywords from Azure Table Storage.")
+    return keywords
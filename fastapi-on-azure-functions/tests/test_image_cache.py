@@ -0,0 +1,32 @@
+# tests/test_image_cache.py
+import asyncio
+import json
+
+from image_cache import ImageAnalysisCache
+
+
+def test_puts_are_saved_together(tmp_path):
+    path = tmp_path / "image_cache.json"
+    result = {"color": "black", "itemName": "財布", "tags": ["長財布"]}
+
+    async def run():
+        cache = ImageAnalysisCache(path=str(path), save_delay=0.05)
+        for dhash in range(10):
+            cache.put("version", dhash, result)
+        # 待ち時間の間は書き出さない
+        assert not path.exists()
+        await asyncio.sleep(0.2)
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.saves == 1
+    assert len(json.loads(path.read_text(encoding="utf-8"))) == 10
+    assert ImageAnalysisCache(path=str(path)).get("version", 3) == result
+
+
+def test_put_outside_event_loop_saves_immediately(tmp_path):
+    path = tmp_path / "image_cache.json"
+    cache = ImageAnalysisCache(path=str(path))
+    cache.put("version", 1, {"color": "red", "itemName": "傘", "tags": []})
+    assert cache.saves == 1
+    assert path.exists()
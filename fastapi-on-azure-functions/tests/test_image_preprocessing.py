@@ -0,0 +1,31 @@
+# tests/test_image_preprocessing.py
+import io
+
+from PIL import Image
+
+from image_preprocessing import preprocess_image
+
+
+def _jpeg(width: int, height: int, quality: int) -> bytes:
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def test_large_jpeg_is_resized_even_if_original_is_smaller():
+    # draft で縮小された後のサイズではなく、元のサイズで縮小の要否を判定する
+    # 2048x2048 の JPEG は draft で 1024x1024 にデコードされる
+    contents = _jpeg(2048, 2048, quality=5)
+    prepared = preprocess_image(contents, "image/jpeg", max_edge=1024, quality=95)
+    # 元の画像の方が小さくても、縮小した画像を送る
+    assert len(prepared.data) > len(contents)
+    assert (prepared.width, prepared.height) == (1024, 1024)
+    assert Image.open(io.BytesIO(prepared.data)).size == (1024, 1024)
+
+
+def test_small_original_is_kept():
+    contents = _jpeg(640, 480, quality=5)
+    prepared = preprocess_image(contents, "image/jpeg", max_edge=1024, quality=95)
+    assert prepared.data == contents
+    assert (prepared.width, prepared.height) == (640, 480)
@@ -0,0 +1,111 @@
+# tests/test_label_import.py
+import asyncio
+import json
+
+import pytest
+
+from label_import import iter_csv_rows, iter_json_array, validate_label_row
+
+CSV_BODY = (
+    'keyword,itemType\r\n'
+    '"黒い\n長財布",財布\r\n'
+    '"折りたたみ傘, 青",傘\r\n'
+    '"引用符 ""A""\n2行目\n3行目",\r\n'
+    'イヤホン,電子機器\r\n'
+).encode("utf-8")
+
+CSV_ROWS = [
+    {"keyword": "黒い\n長財布", "itemType": "財布"},
+    {"keyword": "折りたたみ傘, 青", "itemType": "傘"},
+    {"keyword": '引用符 "A"\n2行目\n3行目', "itemType": ""},
+    {"keyword": "イヤホン", "itemType": "電子機器"},
+]
+
+JSON_ROWS = [
+    {"keyword": "黒い\n長財布", "itemType": "財布"},
+    {"keyword": "括弧 ] } [ {", "itemType": "傘"},
+    {"keyword": 'エスケープ \\" "', "itemType": None},
+    5,
+    {"keyword": "イヤホン", "nested": {"a": [1, 2]}},
+]
+
+
+async def chunked(body: bytes, size: int, consumed: list = None):
+    for start in range(0, len(body), size):
+        if consumed is not None:
+            consumed.append(start)
+        yield body[start:start + size]
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 41))
+def test_csv_quoted_multiline_fields_any_chunk_size(chunk_size):
+    rows = asyncio.run(collect(iter_csv_rows(chunked(CSV_BODY, chunk_size))))
+    assert rows == CSV_ROWS
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 41))
+def test_json_array_any_chunk_size(chunk_size):
+    body = json.dumps(JSON_ROWS, ensure_ascii=False).encode("utf-8")
+    rows = asyncio.run(collect(iter_json_array(chunked(body, chunk_size))))
+    assert rows == JSON_ROWS
+
+
+@pytest.mark.parametrize("element", ['{"keyword": "x"]', '{"keyword" "x"}', "tru"])
+def test_malformed_json_element_fails_without_reading_the_rest(element):
+    body = ('[{"keyword": "ok"}, ' + element + ', ' + ', '.join(['{"keyword": "rest"}'] * 1000) + ']').encode("utf-8")
+    consumed = []
+
+    async def run():
+        rows = []
+        with pytest.raises(ValueError):
+            async for row in iter_json_array(chunked(body, 16, consumed)):
+                rows.append(row)
+        return rows
+
+    assert asyncio.run(run()) == [{"keyword": "ok"}]
+    assert len(consumed) * 16 < 100
+
+
+def test_unclosed_json_array():
+    with pytest.raises(ValueError):
+        asyncio.run(collect(iter_json_array(chunked(b'[{"keyword": "x"}', 4))))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+@pytest.mark.parametrize("body, expected", [
+    (b'[{"keyword": "a"} {"keyword": "b"}]', [{"keyword": "a"}]),
+    (b'[{"keyword": "a"},,{"keyword": "b"}]', [{"keyword": "a"}]),
+    (b'[,{"keyword": "a"}]', []),
+    (b'[{"keyword": "a"},]', [{"keyword": "a"}]),
+    (b'[1 2]', [1]),
+    (b'[{"keyword": "a"}] {"keyword": "b"}', [{"keyword": "a"}]),
+    (b'[{"keyword": "a"}]]', [{"keyword": "a"}]),
+])
+def test_malformed_json_separators(body, expected, chunk_size):
+    async def run():
+        rows = []
+        with pytest.raises(ValueError):
+            async for row in iter_json_array(chunked(body, chunk_size)):
+                rows.append(row)
+        return rows
+
+    assert asyncio.run(run()) == expected
+
+
+@pytest.mark.parametrize("body, expected", [
+    (b'[]', []),
+    (b' [ ] \n', []),
+    (b'[1, "x" ,null,\n{"a": [1, 2]}]\r\n', [1, "x", None, {"a": [1, 2]}]),
+])
+def test_json_array_whitespace(body, expected):
+    assert asyncio.run(collect(iter_json_array(chunked(body, 2)))) == expected
+
+
+def test_validate_label_row():
+    assert validate_label_row({"keyword": " 傘 ", "itemType": ""}) == {"keyword": "傘"}
+    with pytest.raises(ValueError):
+        validate_label_row({"keyword": "x", "itemType": "a/b"})
@@ -0,0 +1,31 @@
+# tests/test_llm_cache.py
+import asyncio
+import json
+
+from llm_cache import KEYWORD, ResolutionCache
+
+
+def test_puts_are_saved_together(tmp_path):
+    path = tmp_path / "llm_cache.json"
+
+    async def run():
+        cache = ResolutionCache(path=str(path), save_delay=0.05)
+        for i in range(10):
+            cache.put(KEYWORD, "fingerprint", f"財布{i}", "財布")
+        # 待ち時間の間は書き出さない
+        assert not path.exists()
+        await asyncio.sleep(0.2)
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.saves == 1
+    assert len(json.loads(path.read_text(encoding="utf-8"))) == 10
+    assert ResolutionCache(path=str(path)).get(KEYWORD, "fingerprint", "財布3") == "財布"
+
+
+def test_put_outside_event_loop_saves_immediately(tmp_path):
+    path = tmp_path / "llm_cache.json"
+    cache = ResolutionCache(path=str(path))
+    cache.put(KEYWORD, "fingerprint", "傘", "傘")
+    assert cache.saves == 1
+    assert path.exists()
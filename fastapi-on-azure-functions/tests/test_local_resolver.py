@@ -0,0 +1,44 @@
+# tests/test_local_resolver.py
+import pytest
+
+from local_resolver import category_resolver, location_resolver, rank_by_relevance
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("財布", "財布"),
+    ("ｻｲﾌ", "財布"),
+    ("スマホ", "携帯電話"),
+    ("AirPods", "携帯音響品"),
+    ("折りたたみ傘", "傘"),
+])
+def test_category_resolved_locally(message, expected):
+    assert category_resolver.resolve(message) == expected
+
+
+@pytest.mark.parametrize("message", [
+    "ノートパソコン",
+    "キーボード",
+    "携帯イヤホン",
+    "携帯扇風機",
+    "黒い長財布",
+])
+def test_containment_is_left_to_gpt(message):
+    choice, score = category_resolver.match(message)
+    assert score < category_resolver.threshold
+    assert category_resolver.resolve(message) is None
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("アサヒカワ", "旭川市"),
+    ("hakodate", "函館市"),
+    ("札幌", "札幌駅"),
+])
+def test_location_resolved_locally(message, expected):
+    assert location_resolver.resolve(message) == expected
+
+
+def test_rank_by_relevance_keeps_related_keywords_first():
+    keywords = ["赤", "ウォレット", "長財布", "黒", "小銭入れ"]
+    ranked = rank_by_relevance(keywords, "財布")
+    assert ranked[:3] == ["ウォレット", "長財布", "小銭入れ"]
+    assert sorted(ranked) == sorted(keywords)
@@ -0,0 +1,43 @@
+# tests/test_lost_item_query.py
+import asyncio
+
+from lost_item_query import query_lost_items
+
+
+async def _aiter(values):
+    for value in values:
+        yield value
+
+
+class FakeQuery:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def by_page(self):
+        return _aiter([_aiter(page) for page in self.pages])
+
+
+class FakeContainer:
+    """max_item_count に関係なく、決まった分割でページを返すコンテナ"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def query_items(self, query, parameters, **options):
+        return FakeQuery(self.pages)
+
+
+def _items(*ids):
+    return [{"id": id, "findDateTime": f"2024-11-{id}"} for id in ids]
+
+
+def test_short_and_empty_pages_are_read_until_page_is_full():
+    container = FakeContainer([_items("30", "29"), [], _items("28"), _items("27", "26", "25")])
+    items = asyncio.run(query_lost_items(container, "SELECT * FROM c", [], page_size=4))
+    assert [item["id"] for item in items] == ["30", "29", "28", "27"]
+
+
+def test_reads_all_pages_when_results_run_out():
+    container = FakeContainer([_items("30"), [], _items("29")])
+    items = asyncio.run(query_lost_items(container, "SELECT * FROM c", [], partition_keys=["札幌駅"], page_size=5))
+    assert [item["id"] for item in items] == ["30", "29"]
@@ -0,0 +1,95 @@
+# tests/test_pagination.py
+import pytest
+
+from pagination import (
+    InvalidContinuationToken,
+    continuation_filter,
+    decode_continuation,
+    encode_continuation,
+    sort_key,
+)
+
+
+def fetch_all_pages(items, page_size, max_pages=100):
+    """
+    Cosmos DB の ORDER BY c.findDateTime DESC, c.id DESC と継続トークンによる絞り込みを再現してページを順に取得する
+    """
+    ordered = sorted(items, key=sort_key, reverse=True)
+    pages = []
+    token = None
+    for _ in range(max_pages):
+        if token is None:
+            candidates = ordered
+        else:
+            last_key = sort_key(decode_continuation(token))
+            candidates = [item for item in ordered if sort_key(item) < last_key]
+        page = candidates[:page_size]
+        pages.append([item["id"] for item in page])
+        if len(page) < page_size:
+            return pages
+        token = encode_continuation(page)
+    pytest.fail(f"paging did not terminate: {pages[:10]}")
+
+
+def flatten(pages):
+    return [item_id for page in pages for item_id in page]
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 7])
+def test_ties_longer_than_page_size(page_size):
+    items = [{"id": str(i), "findDateTime": "2024-11-19T10:00:00"} for i in range(5)]
+    ids = flatten(fetch_all_pages(items, page_size))
+    assert ids == ["4", "3", "2", "1", "0"]
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 4])
+def test_null_and_missing_dates_are_paged_after_dated_items(page_size):
+    items = [
+        {"id": "a", "findDateTime": "2024-11-20T09:00:00"},
+        {"id": "b", "findDateTime": None},
+        {"id": "c", "findDateTime": "2024-11-19T10:00:00"},
+        {"id": "d"},
+        {"id": "e", "findDateTime": "2024-11-19T10:00:00"},
+        {"id": "f", "findDateTime": None},
+    ]
+    ids = flatten(fetch_all_pages(items, page_size))
+    # null は未設定より前に並ぶ（Cosmos DB の ORDER BY と同じ）
+    assert ids == ["a", "e", "c", "f", "b", "d"]
+
+
+def test_page_ending_with_null_date_returns_token():
+    token = encode_continuation([{"id": "x", "findDateTime": None}])
+    assert token is not None
+    assert decode_continuation(token) == {"id": "x", "findDateTime": None}
+
+    clause, parameters = continuation_filter(token)
+    assert "IS_NULL(c.findDateTime) AND c.id < @lastId" in clause
+    assert "OR NOT IS_DEFINED(c.findDateTime)" in clause
+    assert parameters == [{"name": "@lastId", "value": "x"}]
+
+
+def test_page_ending_with_missing_date_returns_token():
+    token = encode_continuation([{"id": "x"}])
+    assert decode_continuation(token) == {"id": "x"}
+
+    clause, parameters = continuation_filter(token)
+    assert clause == "(NOT IS_DEFINED(c.findDateTime) AND c.id < @lastId)"
+    assert parameters == [{"name": "@lastId", "value": "x"}]
+
+
+def test_null_sorts_before_missing():
+    assert sort_key({"id": "a", "findDateTime": None}) > sort_key({"id": "z"})
+    assert sort_key({"id": "a", "findDateTime": "2024-11-19"}) > sort_key({"id": "z", "findDateTime": None})
+
+
+def test_filter_uses_composite_keyset():
+    token = encode_continuation([{"id": "x", "findDateTime": "2024-11-19T10:00:00"}])
+    clause, parameters = continuation_filter(token)
+    assert "c.id < @lastId" in clause
+    assert {"name": "@lastSortValue", "value": "2024-11-19T10:00:00"} in parameters
+    assert {"name": "@lastId", "value": "x"} in parameters
+
+
+def test_invalid_token():
+    with pytest.raises(InvalidContinuationToken):
+        decode_continuation("not-a-token")
@@ -0,0 +1,25 @@
+# tests/test_serialization.py
+import pytest
+
+from models import LostItem
+from serialization import trusted_lost_item, trusted_lost_items_response
+
+
+@pytest.mark.parametrize("stored", [
+    "2024-11-19T10:00:00.000Z",
+    "2024-11-19T10:00",
+    "2024-11-19T10:00:00.123456",
+    "2024-11-19T10:00:00+09:00",
+    "2024-11-19",
+    None,
+])
+def test_trusted_matches_model_output(stored):
+    document = {"id": "1", "createUserPlace": "札幌駅", "findDateTime": stored, "_ts": 1730419200}
+    assert trusted_lost_item(document) == LostItem(**document).model_dump(mode="json")
+
+
+def test_projected_datetime_is_normalized():
+    items = [{"id": "1", "findDateTime": "2024-11-19T10:00:00.000Z"}]
+    assert trusted_lost_items_response(items, projected=True) == [{"id": "1", "findDateTime": "2024-11-19T10:00:00Z"}]
+    # 元のドキュメントは変更しない
+    assert items[0]["findDateTime"] == "2024-11-19T10:00:00.000Z"
@@ -0,0 +1,36 @@
+# tests/test_subcategory_projector.py
+import asyncio
+
+import subcategory_projector
+
+
+class FakeViewContainer:
+    def __init__(self):
+        self.rows = {}
+
+    async def upsert_item(self, body):
+        self.rows[(body["Subcategory"], body["id"])] = body
+
+    async def execute_item_batch(self, batch_operations, partition_key):
+        for operation, (id,) in batch_operations:
+            assert operation == "delete"
+            self.rows.pop((partition_key, id), None)
+
+
+def test_tombstones_remove_view_rows(monkeypatch):
+    container = FakeViewContainer()
+
+    async def get_container():
+        return container
+
+    monkeypatch.setattr(subcategory_projector, "get_lost_item_by_subcategory_container", get_container)
+
+    live = {"id": "1", "item": {"itemName": "財布"}, "_ts": 1}
+    deleted = {"id": "2", "item": {"itemName": "財布"}, "deleted": True, "ttl": 60}
+    asyncio.run(subcategory_projector.project([live, {"id": "2", "item": {"itemName": "財布"}}]))
+    assert set(container.rows) == {("財布", "1"), ("財布", "2")}
+
+    # 削除前の変更を処理した後に論理削除が届いても、ビューに残らない
+    assert asyncio.run(subcategory_projector.project([deleted])) == 1
+    assert set(container.rows) == {("財布", "1")}
+    assert "_ts" not in container.rows[("財布", "1")]
@@ -7,8 +7,11 @@ import SearchBar from '@components/search/SearchBar';
 import FilterSection from '@components/search/FilterSection';
 import ItemGrid from '@components/search/ItemGrid';
 import DetailSidebar from '@components/search/DetailSidebar';
-import { Container, Grid } from '@mui/material';
-import { ItemData } from '../../types'; // パスを適宜調整してください
+import { Button, Container, Grid } from '@mui/material';
+import { ItemData, ItemPage } from '../../types'; // パスを適宜調整してください
+
+// 1回のリクエストで取得する件数
+const PAGE_SIZE = 30;
 
 const SearchPage: React.FC = () => {
   const [items, setItems] = useState<ItemData[]>([]);
@@ -20,14 +23,21 @@ const SearchPage: React.FC = () => {
   const [selectedColor, setSelectedColor] = useState<string | null>(null);
   const [selectedDate, setSelectedDate] = useState<string | null>(null);
   const [freeText, setFreeText] = useState<string | null>(null);
+  const [continuation, setContinuation] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
 
-  const fetchData = useCallback(async () => {
+  const fetchData = useCallback(async (nextToken: string | null = null) => {
     const apiBaseUrl = process.env.NEXT_PUBLIC_API_BASE_URL;
     let apiUrl = `${apiBaseUrl}/lostitems`;
 
     // フィルター条件をURLに追加
     const filters = [];
     filters.push(`isChecked=true`); // isChecked が true のものだけを取得
+    filters.push(`limit=${PAGE_SIZE}`); // ページ単位で取得
+    filters.push(`fields=detail`); // 一覧と詳細表示で使用する項目のみ取得
+    if (nextToken) {
+      filters.push(`continuation=${encodeURIComponent(nextToken)}`); // 次ページの継続トークン
+    }
     if (subcategory) {
       filters.push(`itemName=${subcategory}`);
     }
@@ -46,13 +56,19 @@ const SearchPage: React.FC = () => {
     }
 
     try {
-      setLoading(true); // ローディングを開始
+      // 追加読み込みの場合は一覧を表示したままにする
+      if (nextToken) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true); // ローディングを開始
+      }
       const res = await fetch(apiUrl);
       if (!res.ok) {
         throw new Error('データ取得に失敗しました');
       }
-      const data: ItemData[] = await res.json(); // 型を明示
-      setItems(data);
+      const data: ItemPage = await res.json(); // 型を明示
+      setItems((prev) => (nextToken ? [...prev, ...data.items] : data.items));
+      setContinuation(data.continuation);
     } catch (error: unknown) {
       if (error instanceof Error) {
         console.error('Error fetching data:', error);
@@ -63,6 +79,7 @@ const SearchPage: React.FC = () => {
       }
     } finally {
       setLoading(false); // ローディングを終了
+      setLoadingMore(false);
     }
   }, [subcategory, selectedColor, selectedDate, freeText]);
 
@@ -121,6 +138,13 @@ const SearchPage: React.FC = () => {
         </Grid>
         <Grid item xs={12} md={9}>
           <ItemGrid items={items} loading={loading} onItemClick={handleItemClick} /> {/* loadingを渡す */}
+          {!loading && continuation && (
+            <div style={{ textAlign: 'center', padding: '20px' }}>
+              <Button variant="outlined" onClick={() => fetchData(continuation)} disabled={loadingMore}>
+                {loadingMore ? '読み込み中...' : 'さらに表示'}
+              </Button>
+            </div>
+          )}
         </Grid>
       </Grid>
       {sidebarOpen && (
@@ -14,4 +14,10 @@ export interface ItemData {
     memo: string;
     keyword: string[];
   }
-  
\ No newline at end of file
+  
+
+// GET /lostitems をページ単位で取得した場合のレスポンス
+export interface ItemPage {
+    items: ItemData[];
+    continuation: string | null;
+  }